@@ -8,246 +8,427 @@ import sqlite3
 import sys
 import os
 import json
+import time
 import psycopg2
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from urllib.parse import quote
 
-def parse_kismet_database(db_path, include_packets=False):
-    """Parse Kismet SQLite database and extract devices, datasources, and optionally packets"""
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from load_checkpoint import LoadCheckpoint, file_hash
+from pg_copy import chunked, copy_buffer
+from validation import ObservationValidator
 
-    # Get table names
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    tables = [row[0] for row in cur.fetchall()]
-    print(f"Found Kismet tables: {', '.join(tables)}", file=sys.stderr)
+# Optional faster JSON decoder for device blobs
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-    devices = []
-    datasources = []
-    packets = []
-    alerts = []
-    snapshots = []
+# Rows fetched per fetchmany() call in streaming mode
+STREAM_BATCH_SIZE = 5000
 
-    # Parse devices table
-    if 'devices' in tables:
-        print(f"Parsing devices table...", file=sys.stderr)
-        try:
-            cur.execute("""
-                SELECT devkey, phyname, devmac, strongest_signal,
-                       min_lat, min_lon, max_lat, max_lon, avg_lat, avg_lon,
-                       device
-                FROM devices
-                WHERE devkey IS NOT NULL
-            """)
+# Rows per COPY batch (and commit) in the bulk loader
+COPY_BATCH_SIZE = 50000
 
-            for row in cur.fetchall():
-                # Parse the device JSON blob
-                device_json = None
-                type_string = None
-                basic_type = None
-                manuf = None
-                first_time = None
-                last_time = None
+DEVICES_SQL = """
+    SELECT devkey, phyname, devmac, strongest_signal,
+           min_lat, min_lon, max_lat, max_lon, avg_lat, avg_lon,
+           device
+    FROM devices
+    WHERE devkey IS NOT NULL
+"""
 
-                try:
-                    if row['device']:
-                        # Handle BLOB data - decode if it's bytes
-                        device_data = row['device']
-                        if isinstance(device_data, bytes):
-                            device_data = device_data.decode('utf-8', errors='replace')
-
-                        # Sanitize JSON: remove null bytes and invalid Unicode sequences
-                        device_data = device_data.replace('\x00', '')  # Remove null bytes
-                        device_data = device_data.replace('\\u0000', '')  # Remove \u0000 escape sequences
-
-                        device_json = json.loads(device_data)
-                        type_string = device_json.get('kismet.device.base.type')
-                        basic_type = device_json.get('kismet.device.base.basic_type_set')
-                        manuf = device_json.get('kismet.device.base.manuf')
-                        first_time = device_json.get('kismet.device.base.first_time')
-                        last_time = device_json.get('kismet.device.base.last_time')
-                except Exception as e:
-                    print(f"Warning: Could not parse device JSON for {row['devkey']}: {e}", file=sys.stderr)
-
-                device = {
-                    'devkey': row['devkey'],
-                    'phyname': row['phyname'],
-                    'devmac': row['devmac'],
-                    'strongest_signal': row['strongest_signal'],
-                    'min_lat': row['min_lat'] if row['min_lat'] else None,
-                    'min_lon': row['min_lon'] if row['min_lon'] else None,
-                    'max_lat': row['max_lat'] if row['max_lat'] else None,
-                    'max_lon': row['max_lon'] if row['max_lon'] else None,
-                    'avg_lat': row['avg_lat'] if row['avg_lat'] else None,
-                    'avg_lon': row['avg_lon'] if row['avg_lon'] else None,
-                    'device_json': json.dumps(device_json) if device_json else None,
-                    'type_string': type_string,
-                    'basic_type_string': str(basic_type) if basic_type else None,
-                    'manuf': manuf,
-                    'first_time': first_time,
-                    'last_time': last_time
-                }
-                devices.append(device)
+DATASOURCES_SQL = """
+    SELECT uuid, typestring, definition, name, interface
+    FROM datasources
+    WHERE uuid IS NOT NULL
+"""
 
-        except Exception as e:
-            print(f"Error parsing devices: {e}", file=sys.stderr)
+PACKETS_SQL = """
+    SELECT ts_sec, ts_usec, phyname, sourcemac, destmac, transmac,
+           frequency, devkey, lat, lon, alt, speed, heading,
+           packet_len, signal, datasource
+    FROM packets
+    WHERE ts_sec IS NOT NULL
+"""
+
+ALERTS_SQL = """
+    SELECT ts_sec, ts_usec, phyname, devmac, lat, lon, header, json
+    FROM alerts
+    WHERE ts_sec IS NOT NULL
+"""
+
+SNAPSHOTS_SQL = """
+    SELECT ts_sec, ts_usec, snaptype, json
+    FROM snapshots
+    WHERE ts_sec IS NOT NULL
+"""
+
+def sanitize_json_blob(blob):
+    """Decode a Kismet JSON BLOB and strip null bytes / \\u0000 escapes"""
+    if isinstance(blob, bytes):
+        blob = blob.decode('utf-8', errors='replace')
 
-    # Parse datasources table
-    if 'datasources' in tables:
-        print(f"Parsing datasources table...", file=sys.stderr)
+    # Sanitize JSON: remove null bytes and invalid Unicode sequences
+    blob = blob.replace('\x00', '')  # Remove null bytes
+    blob = blob.replace('\\u0000', '')  # Remove \u0000 escape sequences
+    return blob
+
+def loads_json(text):
+    """Decode JSON with orjson when installed, falling back to the stdlib"""
+    if orjson is not None:
         try:
-            cur.execute("""
-                SELECT uuid, typestring, definition, name, interface
-                FROM datasources
-                WHERE uuid IS NOT NULL
-            """)
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # orjson is stricter (e.g. integers beyond 64 bits); let the
+            # stdlib decide so both backends accept the same documents
+            pass
+    return json.loads(text)
 
-            for row in cur.fetchall():
-                datasource = {
-                    'uuid': row['uuid'],
-                    'typestring': row['typestring'],
-                    'definition': row['definition'],
-                    'name': row['name'],
-                    'interface': row['interface']
-                }
-                datasources.append(datasource)
+def device_from_row(row):
+    """Build a device record from a devices table row"""
+    # Parse the device JSON blob. The blob is only decoded to validate it and
+    # read the kismet.device.base.* fields; the sanitized text itself is
+    # stored as device_json instead of being re-serialized.
+    device_json = None
+    type_string = None
+    basic_type = None
+    manuf = None
+    first_time = None
+    last_time = None
 
-        except Exception as e:
-            print(f"Error parsing datasources: {e}", file=sys.stderr)
+    try:
+        if row['device']:
+            device_text = sanitize_json_blob(row['device'])
+            device = loads_json(device_text)
+            device_json = device_text if device else None
+            type_string = device.get('kismet.device.base.type')
+            basic_type = device.get('kismet.device.base.basic_type_set')
+            manuf = device.get('kismet.device.base.manuf')
+            first_time = device.get('kismet.device.base.first_time')
+            last_time = device.get('kismet.device.base.last_time')
+    except Exception as e:
+        print(f"Warning: Could not parse device JSON for {row['devkey']}: {e}", file=sys.stderr)
+
+    return {
+        'devkey': row['devkey'],
+        'phyname': row['phyname'],
+        'devmac': row['devmac'],
+        'strongest_signal': row['strongest_signal'],
+        'min_lat': row['min_lat'],
+        'min_lon': row['min_lon'],
+        'max_lat': row['max_lat'],
+        'max_lon': row['max_lon'],
+        'avg_lat': row['avg_lat'],
+        'avg_lon': row['avg_lon'],
+        'device_json': device_json,
+        'type_string': type_string,
+        'basic_type_string': str(basic_type) if basic_type else None,
+        'manuf': manuf,
+        'first_time': first_time,
+        'last_time': last_time
+    }
+
+def datasource_from_row(row):
+    """Build a datasource record from a datasources table row"""
+    return {
+        'uuid': row['uuid'],
+        'typestring': row['typestring'],
+        'definition': row['definition'],
+        'name': row['name'],
+        'interface': row['interface']
+    }
 
-    # Parse packets table (optional - high volume)
-    if include_packets and 'packets' in tables:
-        # Get total packet count first
-        cur.execute("SELECT COUNT(*) FROM packets WHERE ts_sec IS NOT NULL")
-        total_packets = cur.fetchone()[0]
-        print(f"Parsing packets table: {total_packets:,} packets (this may take a while)...", file=sys.stderr)
+def packet_from_row(row):
+    """Build a packet record from a packets table row"""
+    return {
+        'ts_sec': row['ts_sec'],
+        'ts_usec': row['ts_usec'],
+        'phyname': row['phyname'],
+        'sourcemac': row['sourcemac'],
+        'destmac': row['destmac'],
+        'transmac': row['transmac'],
+        'frequency': row['frequency'],
+        'devkey': row['devkey'],
+        'lat': row['lat'],
+        'lon': row['lon'],
+        'alt': row['alt'],
+        'speed': row['speed'],
+        'heading': row['heading'],
+        'packet_len': row['packet_len'],
+        'signal': row['signal'],
+        'datasource': row['datasource']
+    }
 
+def alert_from_row(row):
+    """Build an alert record from an alerts table row"""
+    # Handle BLOB JSON data
+    json_data = None
+    if row['json']:
         try:
-            # Remove limit - process all packets
-            cur.execute("""
-                SELECT ts_sec, ts_usec, phyname, sourcemac, destmac, transmac,
-                       frequency, devkey, lat, lon, alt, speed, heading,
-                       packet_len, signal, datasource
-                FROM packets
-                WHERE ts_sec IS NOT NULL
-            """)
+            json_data = sanitize_json_blob(row['json'])
+        except Exception as e:
+            print(f"Warning: Could not decode alert JSON: {e}", file=sys.stderr)
 
-            for row in cur.fetchall():
-                packet = {
-                    'ts_sec': row['ts_sec'],
-                    'ts_usec': row['ts_usec'],
-                    'phyname': row['phyname'],
-                    'sourcemac': row['sourcemac'],
-                    'destmac': row['destmac'],
-                    'transmac': row['transmac'],
-                    'frequency': row['frequency'],
-                    'devkey': row['devkey'],
-                    'lat': row['lat'] if row['lat'] else None,
-                    'lon': row['lon'] if row['lon'] else None,
-                    'alt': row['alt'] if row['alt'] else None,
-                    'speed': row['speed'] if row['speed'] else None,
-                    'heading': row['heading'] if row['heading'] else None,
-                    'packet_len': row['packet_len'],
-                    'signal': row['signal'],
-                    'datasource': row['datasource']
-                }
-                packets.append(packet)
+    return {
+        'ts_sec': row['ts_sec'],
+        'ts_usec': row['ts_usec'],
+        'phyname': row['phyname'],
+        'devmac': row['devmac'],
+        'lat': row['lat'],
+        'lon': row['lon'],
+        'header': row['header'],
+        'json_data': json_data
+    }
 
+def snapshot_from_row(row):
+    """Build a snapshot record from a snapshots table row"""
+    # Handle BLOB JSON data
+    json_data = None
+    if row['json']:
+        try:
+            json_data = sanitize_json_blob(row['json'])
         except Exception as e:
-            print(f"Error parsing packets: {e}", file=sys.stderr)
+            print(f"Warning: Could not decode snapshot JSON: {e}", file=sys.stderr)
+
+    return {
+        'ts_sec': row['ts_sec'],
+        'ts_usec': row['ts_usec'],
+        'snaptype': row['snaptype'],
+        'json_data': json_data
+    }
+
+# table name -> (query, row converter)
+KISMET_TABLES = {
+    'devices': (DEVICES_SQL, device_from_row),
+    'datasources': (DATASOURCES_SQL, datasource_from_row),
+    'packets': (PACKETS_SQL, packet_from_row),
+    'alerts': (ALERTS_SQL, alert_from_row),
+    'snapshots': (SNAPSHOTS_SQL, snapshot_from_row),
+}
+
+def open_kismet_database(db_path):
+    """Open a Kismet database read-only with Row access"""
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(db_path))}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def list_kismet_tables(db_path):
+    """Names of the tables present in a Kismet database"""
+    conn = open_kismet_database(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    finally:
+        conn.close()
+
+class KismetTableStream:
+    """
+    Lazily iterate one Kismet table in fetchmany() batches
+
+    Each iteration opens its own read-only connection, so only one batch of
+    rows is held in memory at a time. len() runs a COUNT(*) over the same
+    query so progress reporting keeps working.
+    """
 
-    # Parse alerts table
-    if 'alerts' in tables:
-        print(f"Parsing alerts table...", file=sys.stderr)
+    def __init__(self, db_path, table, batch_size=STREAM_BATCH_SIZE):
+        self.db_path = db_path
+        self.table = table
+        self.sql, self.convert = KISMET_TABLES[table]
+        self.batch_size = batch_size
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            conn = open_kismet_database(self.db_path)
+            try:
+                self._count = conn.execute(f"SELECT COUNT(*) FROM ({self.sql})").fetchone()[0]
+            finally:
+                conn.close()
+        return self._count
+
+    def __iter__(self):
+        print(f"Streaming {self.table} table...", file=sys.stderr)
+        conn = open_kismet_database(self.db_path)
         try:
-            cur.execute("""
-                SELECT ts_sec, ts_usec, phyname, devmac, lat, lon, header, json
-                FROM alerts
-                WHERE ts_sec IS NOT NULL
-            """)
+            cur = conn.execute(self.sql)
+            while True:
+                rows = cur.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self.convert(row)
+        except sqlite3.Error as e:
+            print(f"Error parsing {self.table}: {e}", file=sys.stderr)
+        finally:
+            conn.close()
 
-            for row in cur.fetchall():
-                # Handle BLOB JSON data
-                json_data = None
-                if row['json']:
-                    try:
-                        json_blob = row['json']
-                        if isinstance(json_blob, bytes):
-                            json_blob = json_blob.decode('utf-8', errors='replace')
-
-                        # Sanitize JSON: remove null bytes and invalid Unicode sequences
-                        json_blob = json_blob.replace('\x00', '')
-                        json_blob = json_blob.replace('\\u0000', '')
-
-                        json_data = json_blob
-                    except Exception as e:
-                        print(f"Warning: Could not decode alert JSON: {e}", file=sys.stderr)
-
-                alert = {
-                    'ts_sec': row['ts_sec'],
-                    'ts_usec': row['ts_usec'],
-                    'phyname': row['phyname'],
-                    'devmac': row['devmac'],
-                    'lat': row['lat'] if row['lat'] else None,
-                    'lon': row['lon'] if row['lon'] else None,
-                    'header': row['header'],
-                    'json_data': json_data
-                }
-                alerts.append(alert)
+# Tables whose JSON sanitize/decode work is worth spreading across processes
+PARALLEL_TABLES = ('devices', 'alerts', 'snapshots')
 
-        except Exception as e:
-            print(f"Error parsing alerts: {e}", file=sys.stderr)
+def decode_rowid_range(db_path, table, start, end):
+    """
+    Worker: convert the rows of table with start <= rowid < end
+    Runs in a child process with its own read-only connection
+    """
+    sql, convert = KISMET_TABLES[table]
+    conn = open_kismet_database(db_path)
+    try:
+        cur = conn.execute(f"{sql} AND rowid >= ? AND rowid < ? ORDER BY rowid", (start, end))
+        return [convert(row) for row in cur]
+    finally:
+        conn.close()
+
+class ParallelKismetTableStream(KismetTableStream):
+    """
+    Decode one Kismet table across a process pool
+
+    The table is split into rowid ranges of batch_size rows that workers
+    convert independently. Results are yielded in rowid order - the same
+    order as the serial full-table scan - with at most a few ranges per
+    worker in flight so memory stays bounded.
+    """
 
-    # Parse snapshots table
-    if 'snapshots' in tables:
-        print(f"Parsing snapshots table...", file=sys.stderr)
+    def __init__(self, db_path, table, workers, batch_size=STREAM_BATCH_SIZE):
+        super().__init__(db_path, table, batch_size)
+        self.workers = workers
+
+    def rowid_ranges(self):
+        """Half-open [start, end) rowid ranges covering the table"""
+        conn = open_kismet_database(self.db_path)
         try:
-            cur.execute("""
-                SELECT ts_sec, ts_usec, snaptype, json
-                FROM snapshots
-                WHERE ts_sec IS NOT NULL
-            """)
+            low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {self.table}").fetchone()
+        finally:
+            conn.close()
+        if low is None:
+            return
+        for start in range(low, high + 1, self.batch_size):
+            yield start, min(start + self.batch_size, high + 1)
 
-            for row in cur.fetchall():
-                # Handle BLOB JSON data
-                json_data = None
-                if row['json']:
-                    try:
-                        json_blob = row['json']
-                        if isinstance(json_blob, bytes):
-                            json_blob = json_blob.decode('utf-8', errors='replace')
-
-                        # Sanitize JSON: remove null bytes and invalid Unicode sequences
-                        json_blob = json_blob.replace('\x00', '')
-                        json_blob = json_blob.replace('\\u0000', '')
-
-                        json_data = json_blob
-                    except Exception as e:
-                        print(f"Warning: Could not decode snapshot JSON: {e}", file=sys.stderr)
-
-                snapshot = {
-                    'ts_sec': row['ts_sec'],
-                    'ts_usec': row['ts_usec'],
-                    'snaptype': row['snaptype'],
-                    'json_data': json_data
-                }
-                snapshots.append(snapshot)
+    def __iter__(self):
+        print(f"Decoding {self.table} table with {self.workers} workers...", file=sys.stderr)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                pending = deque()
+                for start, end in self.rowid_ranges():
+                    pending.append(pool.submit(decode_rowid_range, self.db_path, self.table, start, end))
+                    if len(pending) >= self.workers * 2:
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+        except sqlite3.Error as e:
+            print(f"Error parsing {self.table}: {e}", file=sys.stderr)
 
-        except Exception as e:
-            print(f"Error parsing snapshots: {e}", file=sys.stderr)
+def stream_kismet_database(db_path, include_packets=False, batch_size=STREAM_BATCH_SIZE, workers=1):
+    """
+    Streaming counterpart of parse_kismet_database
+    Returns the same keys, but each value is a lazy KismetTableStream
+    (or an empty list when the table is absent). With workers > 1 the
+    devices, alerts and snapshots tables are decoded in a process pool.
+    """
+    tables = list_kismet_tables(db_path)
+    print(f"Found Kismet tables: {', '.join(tables)}", file=sys.stderr)
 
-    conn.close()
+    data = {}
+    for table in KISMET_TABLES:
+        if table in tables and (table != 'packets' or include_packets):
+            if workers > 1 and table in PARALLEL_TABLES:
+                data[table] = ParallelKismetTableStream(db_path, table, workers, batch_size)
+            else:
+                data[table] = KismetTableStream(db_path, table, batch_size)
+        else:
+            data[table] = []
+    return data
 
+def kismet_validators():
+    """
+    Validation stages per table, applied to records before loading
+    Kismet writes 0/0 for positions without a GPS fix, so bad positions are
+    cleared instead of dropping the record - a packet without a fix is
+    still a packet - and timestamps are checked but never cleared.
+    """
     return {
-        'devices': devices,
-        'datasources': datasources,
-        'packets': packets,
-        'alerts': alerts,
-        'snapshots': snapshots
+        'devices': [
+            ObservationValidator('avg_lat', 'avg_lon', level='strongest_signal', bad_position='null'),
+            ObservationValidator('min_lat', 'min_lon', bad_position='null'),
+            ObservationValidator('max_lat', 'max_lon', bad_position='null'),
+        ],
+        'packets': [
+            ObservationValidator(altitude='alt', level='signal', time='ts_sec', time_scale=1,
+                                 extra_time='ts_usec', bad_position='null', clear_time=False),
+        ],
+        'alerts': [
+            ObservationValidator(time='ts_sec', time_scale=1, extra_time='ts_usec',
+                                 bad_position='null', clear_time=False),
+        ],
     }
 
-def load_to_database(filename, data, db_config):
-    """Load parsed Kismet data into PostgreSQL staging tables"""
+def validate_kismet_data(data, validators):
+    """Wrap each validated table of data (lists or streams) in its stages"""
+    for table, stages in validators.items():
+        for validator in stages:
+            data[table] = validator.stream(data[table])
+    return data
+
+def validate_kismet_records(table, records, validators):
+    """Run one batch of records of table through its stages"""
+    for validator in validators.get(table, ()):
+        records = validator.apply(records)
+    return records
+
+def report_validation(validators):
+    """Print what the validation stages flagged"""
+    for table, stages in validators.items():
+        for validator in stages:
+            if validator.checked:
+                print(f"Validation {table} ({validator.lat}/{validator.lon}): {validator.summary()}",
+                      file=sys.stderr)
+
+def parse_kismet_database(db_path, include_packets=False):
+    """Parse Kismet SQLite database and extract devices, datasources, and optionally packets"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+
+    # Get table names
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    tables = [row[0] for row in cur.fetchall()]
+    print(f"Found Kismet tables: {', '.join(tables)}", file=sys.stderr)
+
+    data = {table: [] for table in KISMET_TABLES}
+
+    for table, (sql, convert) in KISMET_TABLES.items():
+        if table not in tables:
+            continue
+
+        if table == 'packets':
+            if not include_packets:
+                continue
+            # Get total packet count first
+            cur.execute("SELECT COUNT(*) FROM packets WHERE ts_sec IS NOT NULL")
+            total_packets = cur.fetchone()[0]
+            print(f"Parsing packets table: {total_packets:,} packets (this may take a while)...", file=sys.stderr)
+        else:
+            print(f"Parsing {table} table...", file=sys.stderr)
+
+        try:
+            cur.execute(sql)
+            for row in cur.fetchall():
+                data[table].append(convert(row))
+        except Exception as e:
+            print(f"Error parsing {table}: {e}", file=sys.stderr)
+
+    conn.close()
+
+    return data
+
+def load_to_database(filename, data, db_config, commit_every=None):
+    """
+    Load parsed Kismet data into PostgreSQL staging tables
+    data values may be lists or lazy streams; commit_every commits after
+    that many devices, alerts or snapshots so streamed rows land early
+    """
     conn = psycopg2.connect(**db_config)
     cur = conn.cursor()
 
@@ -293,6 +474,8 @@ def load_to_database(filename, data, db_config):
                     device['last_time']
                 ))
                 stats['devices'] += 1
+                if commit_every and stats['devices'] % commit_every == 0:
+                    conn.commit()
             except Exception as e:
                 print(f"Error inserting device {device['devkey']}: {e}", file=sys.stderr)
                 continue
@@ -383,6 +566,8 @@ def load_to_database(filename, data, db_config):
                         filename
                     ))
                     stats['alerts'] += 1
+                    if commit_every and stats['alerts'] % commit_every == 0:
+                        conn.commit()
                 except Exception as e:
                     print(f"Error inserting alert: {e}", file=sys.stderr)
                     continue
@@ -404,6 +589,8 @@ def load_to_database(filename, data, db_config):
                         filename
                     ))
                     stats['snapshots'] += 1
+                    if commit_every and stats['snapshots'] % commit_every == 0:
+                        conn.commit()
                 except Exception as e:
                     print(f"Error inserting snapshot: {e}", file=sys.stderr)
                     continue
@@ -421,13 +608,430 @@ def load_to_database(filename, data, db_config):
 
     return stats
 
+# Column order of each staging table as written by the bulk loader;
+# kismet_filename is appended to every row
+DEVICE_COLUMNS = (
+    'devkey', 'phyname', 'devmac', 'strongest_signal', 'min_lat', 'min_lon',
+    'max_lat', 'max_lon', 'avg_lat', 'avg_lon', 'device_json', 'type_string',
+    'basic_type_string', 'manuf', 'first_time', 'last_time'
+)
+
+PACKET_COLUMNS = (
+    'ts_sec', 'ts_usec', 'phyname', 'sourcemac', 'destmac', 'transmac', 'frequency',
+    'devkey', 'lat', 'lon', 'alt', 'speed', 'heading', 'packet_len', 'signal', 'datasource'
+)
+
+ALERT_COLUMNS = ('ts_sec', 'ts_usec', 'phyname', 'devmac', 'lat', 'lon', 'header', 'json_data')
+
+SNAPSHOT_COLUMNS = ('ts_sec', 'ts_usec', 'snaptype', 'json_data')
+
+DEVICES_TEMP_TABLE = """
+    CREATE TEMP TABLE kismet_devices_tmp (
+        ord BIGSERIAL,
+        devkey TEXT,
+        phyname TEXT,
+        devmac TEXT,
+        strongest_signal INTEGER,
+        min_lat DOUBLE PRECISION,
+        min_lon DOUBLE PRECISION,
+        max_lat DOUBLE PRECISION,
+        max_lon DOUBLE PRECISION,
+        avg_lat DOUBLE PRECISION,
+        avg_lon DOUBLE PRECISION,
+        device_json JSONB,
+        type_string TEXT,
+        basic_type_string TEXT,
+        manuf TEXT,
+        first_time BIGINT,
+        last_time BIGINT,
+        kismet_filename TEXT
+    ) ON COMMIT DROP
+"""
+
+# Same merge as the per-row loader, applied as one set operation. Repeated
+# devkeys are collapsed first (first row wins, GREATEST of signal and
+# last_time) because ON CONFLICT DO UPDATE cannot touch a row twice.
+DEVICES_MERGE = """
+    INSERT INTO app.kismet_devices_staging
+    (devkey, phyname, devmac, strongest_signal, min_lat, min_lon, max_lat, max_lon,
+     avg_lat, avg_lon, device_json, kismet_filename, type_string, basic_type_string,
+     manuf, first_time, last_time)
+    SELECT DISTINCT ON (devkey)
+        devkey, phyname, devmac, MAX(strongest_signal) OVER w, min_lat, min_lon,
+        max_lat, max_lon, avg_lat, avg_lon, device_json, kismet_filename, type_string,
+        basic_type_string, manuf, first_time, MAX(last_time) OVER w
+    FROM kismet_devices_tmp
+    WINDOW w AS (PARTITION BY devkey)
+    ORDER BY devkey, ord
+    ON CONFLICT (devkey, kismet_filename) DO UPDATE SET
+        strongest_signal = GREATEST(EXCLUDED.strongest_signal, app.kismet_devices_staging.strongest_signal),
+        last_time = GREATEST(EXCLUDED.last_time, app.kismet_devices_staging.last_time)
+"""
+
+def copy_with_fallback(cur, table, columns, rows):
+    """
+    COPY one batch of rows; if the batch is rejected (e.g. one malformed
+    JSON document), retry it row by row so only the bad rows are skipped
+    like in the per-row loader.
+    Returns the number of rows written
+    """
+    cur.execute("SAVEPOINT kismet_copy")
+    try:
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", copy_buffer(rows))
+        cur.execute("RELEASE SAVEPOINT kismet_copy")
+        return len(rows)
+    except psycopg2.Error as e:
+        cur.execute("ROLLBACK TO SAVEPOINT kismet_copy")
+        print(f"COPY into {table} rejected ({e}); retrying batch row by row", file=sys.stderr)
+
+    insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    written = 0
+    for row in rows:
+        try:
+            cur.execute("SAVEPOINT kismet_row")
+            cur.execute(insert_sql, row)
+            cur.execute("RELEASE SAVEPOINT kismet_row")
+            written += 1
+        except psycopg2.Error as e:
+            cur.execute("ROLLBACK TO SAVEPOINT kismet_row")
+            print(f"Error inserting row into {table}: {e}", file=sys.stderr)
+    cur.execute("RELEASE SAVEPOINT kismet_copy")
+    return written
+
+def bulk_load_to_database(filename, data, db_config, batch_size=COPY_BATCH_SIZE):
+    """
+    Load parsed Kismet data with COPY FROM STDIN instead of per-row INSERTs
+    Packets, alerts and snapshots are copied straight into their staging
+    tables and committed per batch; devices are copied into a temp table
+    and merged with one ON CONFLICT statement.
+    """
+    conn = psycopg2.connect(**db_config)
+    cur = conn.cursor()
+
+    stats = {
+        'devices': 0,
+        'datasources': 0,
+        'packets': 0,
+        'alerts': 0,
+        'snapshots': 0
+    }
+
+    try:
+        # Devices: COPY into a temp table, then one set-based merge
+        print(f"Loading {len(data['devices'])} devices...", file=sys.stderr)
+        cur.execute(DEVICES_TEMP_TABLE)
+        device_rows = (
+            tuple(device[c] for c in DEVICE_COLUMNS) + (filename,)
+            for device in data['devices']
+        )
+        for batch in chunked(device_rows, batch_size):
+            copy_with_fallback(cur, 'kismet_devices_tmp', DEVICE_COLUMNS + ('kismet_filename',), batch)
+        cur.execute(DEVICES_MERGE)
+        stats['devices'] = cur.rowcount
+        conn.commit()
+
+        # Datasources: a handful of rows, keep the per-row upsert
+        print(f"Loading {len(data['datasources'])} datasources...", file=sys.stderr)
+        for ds in data['datasources']:
+            cur.execute("""
+                INSERT INTO app.kismet_datasources_staging
+                (uuid, typestring, definition, name, interface, kismet_filename)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (uuid, kismet_filename) DO NOTHING
+            """, (
+                ds['uuid'],
+                ds['typestring'],
+                ds['definition'],
+                ds['name'],
+                ds['interface'],
+                filename
+            ))
+            stats['datasources'] += 1
+        conn.commit()
+
+        for key, table, columns in (
+            ('packets', 'app.kismet_packets_staging', PACKET_COLUMNS),
+            ('alerts', 'app.kismet_alerts_staging', ALERT_COLUMNS),
+            ('snapshots', 'app.kismet_snapshots_staging', SNAPSHOT_COLUMNS),
+        ):
+            if not data[key]:
+                continue
+            total = len(data[key])
+            print(f"Loading {total:,} {key}...", file=sys.stderr)
+            rows = (tuple(record[c] for c in columns) + (filename,) for record in data[key])
+            for batch in chunked(rows, batch_size):
+                stats[key] += copy_with_fallback(cur, table, columns + ('kismet_filename',), batch)
+                conn.commit()
+                progress = (stats[key] / total) * 100 if total else 100.0
+                print(f"  {stats[key]:,}/{total:,} {key} copied ({progress:.1f}%)...", file=sys.stderr)
+
+        conn.commit()
+        print(f"✓ Loaded {filename}: {stats}", file=sys.stderr)
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error loading {filename}: {e}", file=sys.stderr)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    return stats
+
+# table name -> (staging table, columns) for the COPY-loaded tables
+KISMET_COPY_TARGETS = {
+    'packets': ('app.kismet_packets_staging', PACKET_COLUMNS),
+    'alerts': ('app.kismet_alerts_staging', ALERT_COLUMNS),
+    'snapshots': ('app.kismet_snapshots_staging', SNAPSHOT_COLUMNS),
+}
+
+def write_kismet_rows(cur, filename, table, records):
+    """
+    Write one batch of converted records of table through cur without
+    committing: COPY for packets, alerts and snapshots, the temp table
+    merge for devices and the per-row upsert for datasources.
+    Returns the number of rows written
+    """
+    if not records:
+        return 0
+    if table == 'devices':
+        cur.execute(DEVICES_TEMP_TABLE)
+        rows = [tuple(device[c] for c in DEVICE_COLUMNS) + (filename,) for device in records]
+        copy_with_fallback(cur, 'kismet_devices_tmp', DEVICE_COLUMNS + ('kismet_filename',), rows)
+        cur.execute(DEVICES_MERGE)
+        written = cur.rowcount
+        cur.execute("DROP TABLE kismet_devices_tmp")
+        return written
+    if table == 'datasources':
+        for ds in records:
+            cur.execute("""
+                INSERT INTO app.kismet_datasources_staging
+                (uuid, typestring, definition, name, interface, kismet_filename)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (uuid, kismet_filename) DO NOTHING
+            """, (
+                ds['uuid'],
+                ds['typestring'],
+                ds['definition'],
+                ds['name'],
+                ds['interface'],
+                filename
+            ))
+        return len(records)
+    target, columns = KISMET_COPY_TARGETS[table]
+    rows = [tuple(record[c] for c in columns) + (filename,) for record in records]
+    return copy_with_fallback(cur, target, columns + ('kismet_filename',), rows)
+
+def resumable_load_to_database(db_path, db_config, include_packets=False, batch_size=COPY_BATCH_SIZE):
+    """
+    Load a Kismet database in rowid ranges of batch_size rows, committing
+    each range together with its checkpoint in app.ingest_checkpoints.
+    Rerunning the same file (matched by content hash) skips finished tables
+    and resumes unfinished ones after the last committed range.
+    """
+    filename = os.path.basename(db_path)
+    print(f"Hashing {filename} for checkpoints...", file=sys.stderr)
+    digest = file_hash(db_path)
+    tables = list_kismet_tables(db_path)
+
+    conn = psycopg2.connect(**db_config)
+    cur = conn.cursor()
+
+    stats = {table: 0 for table in KISMET_TABLES}
+    validators = kismet_validators()
+
+    try:
+        journal = LoadCheckpoint(cur, digest, filename)
+        conn.commit()
+
+        for table in KISMET_TABLES:
+            if table not in tables or (table == 'packets' and not include_packets):
+                continue
+
+            last_rowid, completed = journal.position(table)
+            if completed:
+                print(f"Skipping {table}: already loaded", file=sys.stderr)
+                continue
+
+            sqlite_conn = open_kismet_database(db_path)
+            try:
+                high = sqlite_conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+            finally:
+                sqlite_conn.close()
+
+            if last_rowid:
+                print(f"Resuming {table} after rowid {last_rowid:,}...", file=sys.stderr)
+            else:
+                print(f"Loading {table}...", file=sys.stderr)
+
+            for start in range(last_rowid + 1, high + 1, batch_size):
+                end = min(start + batch_size, high + 1)
+                records = validate_kismet_records(table, decode_rowid_range(db_path, table, start, end), validators)
+                stats[table] += write_kismet_rows(cur, filename, table, records)
+                journal.advance(table, end - 1, len(records))
+                conn.commit()
+                print(f"  {table}: rowid {end - 1:,}/{high:,} committed", file=sys.stderr)
+
+            journal.complete(table)
+            conn.commit()
+
+        report_validation(validators)
+        print(f"✓ Loaded {filename}: {stats}", file=sys.stderr)
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error loading {filename}: {e}", file=sys.stderr)
+        print("  Rerun the same file to resume from the last checkpoint", file=sys.stderr)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    return stats
+
+# Seconds between polls of a live capture in follow mode
+FOLLOW_INTERVAL = 5.0
+
+# Most rows read from one append-only table per poll; a backlog larger than
+# this is drained over consecutive polls without sleeping in between
+FOLLOW_MAX_ROWS = COPY_BATCH_SIZE
+
+def read_new_rows(db_path, table, watermark, max_rows=FOLLOW_MAX_ROWS):
+    """
+    Read the rows of table added after watermark from a (possibly live)
+    Kismet database.
+
+    Kismet only appends to packets, alerts, snapshots and datasources, so
+    their watermark is the last rowid read. Device rows are rewritten in
+    place (UNIQUE ... ON CONFLICT REPLACE), which can reuse a rowid, so
+    devices are tracked by their last_time column instead and every device
+    seen since the previous poll's newest last_time is re-read; the device
+    upsert makes re-reading harmless.
+    Returns (records, new watermark, True if rows beyond max_rows remain)
+    """
+    sql, convert = KISMET_TABLES[table]
+    conn = open_kismet_database(db_path)
+    try:
+        if table == 'devices':
+            high = conn.execute("SELECT MAX(last_time) FROM devices").fetchone()[0]
+            if high is None or high < watermark:
+                return [], watermark, False
+            cur = conn.execute(f"{sql} AND last_time >= ?", (watermark,))
+            return [convert(row) for row in cur], high, False
+
+        high = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0]
+        if high is None or high <= watermark:
+            return [], watermark, False
+        end = min(high, watermark + max_rows)
+        cur = conn.execute(f"{sql} AND rowid > ? AND rowid <= ? ORDER BY rowid", (watermark, end))
+        return [convert(row) for row in cur], end, end < high
+    finally:
+        conn.close()
+
+def load_poll(filename, data, db_config):
+    """
+    Write one follow-mode poll of every table in a single transaction
+    Packets, alerts and snapshots have no unique key, so a poll must land
+    completely or not at all for its retry not to duplicate rows.
+    Returns rows written per table
+    """
+    conn = psycopg2.connect(**db_config)
+    cur = conn.cursor()
+    stats = {table: 0 for table in KISMET_TABLES}
+
+    try:
+        for table in KISMET_TABLES:
+            stats[table] = write_kismet_rows(cur, filename, table, data[table])
+        conn.commit()
+        print(f"✓ Loaded {filename}: {stats}", file=sys.stderr)
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error loading {filename}: {e}", file=sys.stderr)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    return stats
+
+def follow_kismet_database(db_path, db_config, include_packets=False,
+                           interval=FOLLOW_INTERVAL, max_polls=None):
+    """
+    Tail a Kismet database that is still being written
+    Polls every interval seconds and loads only the rows added since the
+    previous poll, all tables in one transaction. Watermarks advance only
+    after that transaction commits, so a failed load (or a locked
+    database) is retried on the next poll without duplicating rows. Runs
+    until interrupted or after max_polls polls.
+    Returns the cumulative load stats
+    """
+    filename = os.path.basename(db_path)
+    tables = [t for t in KISMET_TABLES if t != 'packets' or include_packets]
+    watermarks = {table: 0 for table in tables}
+    totals = {table: 0 for table in KISMET_TABLES}
+    validators = kismet_validators()
+    polls = 0
+
+    print(f"Following {db_path} every {interval:g}s (Ctrl-C to stop)...", file=sys.stderr)
+    try:
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            data = {table: [] for table in KISMET_TABLES}
+            marks = dict(watermarks)
+            backlog = False
+            try:
+                present = list_kismet_tables(db_path)
+                for table in tables:
+                    if table not in present:
+                        continue
+                    records, marks[table], more = read_new_rows(db_path, table, watermarks[table])
+                    data[table] = validate_kismet_records(table, records, validators)
+                    backlog = backlog or more
+            except sqlite3.Error as e:
+                # Kismet may hold a write lock; try again on the next poll
+                print(f"Error reading {db_path}: {e}", file=sys.stderr)
+                time.sleep(interval)
+                continue
+
+            if any(data.values()):
+                try:
+                    stats = load_poll(filename, data, db_config)
+                except Exception:
+                    # Already reported and rolled back; keep the old watermarks
+                    time.sleep(interval)
+                    continue
+                for table, count in stats.items():
+                    totals[table] += count
+            # Rows the validator dropped are consumed too
+            watermarks = marks
+
+            if not backlog and (max_polls is None or polls < max_polls):
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped following", file=sys.stderr)
+
+    report_validation(validators)
+
+    return totals
+
 def main():
     if len(sys.argv) < 2:
-        print("Usage: kismet_parser.py <kismet_database.kismet> [--include-packets]")
+        print("Usage: kismet_parser.py <kismet_database.kismet> [--include-packets] [--stream] [--copy] [--workers N] [--resume] [--follow [--interval S]]")
         sys.exit(1)
 
     kismet_file = sys.argv[1]
     include_packets = '--include-packets' in sys.argv
+    stream = '--stream' in sys.argv
+    use_copy = '--copy' in sys.argv
+    workers = 1
+    if '--workers' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('--workers') + 1])
+    resume = '--resume' in sys.argv
+    follow = '--follow' in sys.argv
+    interval = FOLLOW_INTERVAL
+    if '--interval' in sys.argv:
+        interval = float(sys.argv[sys.argv.index('--interval') + 1])
 
     if not os.path.exists(kismet_file):
         print(f"Error: File {kismet_file} not found")
@@ -442,17 +1046,45 @@ def main():
         'password': os.getenv('DB_PASSWORD', 'DJvHRxGZ2e+rDgkO4LWXZG1np80rU4daQNQpQ3PwvZ8=')
     }
 
+    if follow or resume:
+        if follow:
+            stats = follow_kismet_database(kismet_file, db_config, include_packets=include_packets,
+                                           interval=interval)
+        else:
+            stats = resumable_load_to_database(kismet_file, db_config, include_packets=include_packets)
+        print(json.dumps({
+            'ok': True,
+            'file': os.path.basename(kismet_file),
+            'stats': stats
+        }))
+        return
+
     print(f"Parsing Kismet database: {kismet_file}...", file=sys.stderr)
     print(f"Include packets: {include_packets}", file=sys.stderr)
 
-    data = parse_kismet_database(kismet_file, include_packets=include_packets)
+    if stream or workers > 1:
+        # Tables are read in fetchmany() batches (or decoded by worker
+        # processes) while they are loaded
+        data = stream_kismet_database(kismet_file, include_packets=include_packets, workers=workers)
+    else:
+        data = parse_kismet_database(kismet_file, include_packets=include_packets)
 
     print(f"Found {len(data['devices'])} devices, {len(data['datasources'])} datasources, "
           f"{len(data['packets'])} packets, {len(data['alerts'])} alerts, {len(data['snapshots'])} snapshots",
           file=sys.stderr)
 
+    # Validate coordinates, signal and time in vectorized batches as the
+    # records are loaded
+    validators = kismet_validators()
+    validate_kismet_data(data, validators)
+
     filename = os.path.basename(kismet_file)
-    stats = load_to_database(filename, data, db_config)
+    if use_copy:
+        stats = bulk_load_to_database(filename, data, db_config)
+    else:
+        stats = load_to_database(filename, data, db_config,
+                                 commit_every=STREAM_BATCH_SIZE if stream else None)
+    report_validation(validators)
 
     # Output JSON for API response
     print(json.dumps({
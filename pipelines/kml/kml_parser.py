@@ -1,42 +1,148 @@
 #!/usr/bin/env python3
 """
 KML Parser for ShadowCheck
-Parses WiGLE KML exports and loads them into PostgreSQL staging tables
+Parses WiGLE KML exports (plain, KMZ or compressed) and loads them into
+PostgreSQL staging tables
 """
 
-import xml.etree.ElementTree as ET
 import sys
 import psycopg2
+import psycopg2.extensions
 import os
 from datetime import datetime
 
-# KML namespace
-NS = {'kml': 'http://www.opengis.net/kml/2.2'}
-
-def parse_kml_file(kml_path):
-    """Parse a KML file and extract network placemarks"""
-    tree = ET.parse(kml_path)
-    root = tree.getroot()
-
-    networks = []
-    locations = []
-
-    # Find all Placemark elements
-    placemarks = root.findall('.//kml:Placemark', NS)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from kml_description import parse_description
+from kml_stream import iter_placemarks
+from pg_copy import copy_rows
+from validation import ObservationValidator
+
+# kml_locations_staging columns written by load_to_database
+LOCATION_COLUMNS = ('source_id', 'bssid', 'level', 'lat', 'lon', 'altitude', 'accuracy', 'time',
+                    'kml_filename', 'ssid', 'network_type', 'encryption_type')
+
+# Locations per COPY batch
+LOCATION_BATCH_SIZE = 10000
+
+# Locations are COPYed into a temp table and merged past
+# idx_kml_locations_dedupe (schema/ingestion_deduplication.sql), so repeated
+# placemarks and re-imported files are skipped instead of failing the load
+LOCATION_TEMP_TABLE = """
+    CREATE TEMP TABLE kml_locations_tmp (
+        source_id INTEGER,
+        bssid TEXT,
+        level INTEGER,
+        lat DOUBLE PRECISION,
+        lon DOUBLE PRECISION,
+        altitude DOUBLE PRECISION,
+        accuracy DOUBLE PRECISION,
+        time BIGINT,
+        kml_filename TEXT,
+        ssid TEXT,
+        network_type TEXT,
+        encryption_type TEXT
+    ) ON COMMIT DROP
+"""
 
-    for pm in placemarks:
-        # Extract name (usually SSID or BSSID)
-        name_elem = pm.find('kml:name', NS)
-        name = name_elem.text if name_elem is not None else None
+# Returns (bssid, rows inserted) for every BSSID that gained rows
+LOCATION_MERGE = f"""
+    WITH inserted AS (
+        INSERT INTO app.kml_locations_staging ({', '.join(LOCATION_COLUMNS)})
+        SELECT {', '.join(LOCATION_COLUMNS)} FROM kml_locations_tmp
+        ON CONFLICT (bssid, time, ROUND(lat::NUMERIC, 6), ROUND(lon::NUMERIC, 6), kml_filename)
+        DO NOTHING
+        RETURNING bssid
+    )
+    SELECT bssid, COUNT(*) FROM inserted GROUP BY bssid
+"""
 
-        # Extract description (contains metadata)
-        desc_elem = pm.find('kml:description', NS)
-        description = desc_elem.text if desc_elem is not None else ''
+# Network metadata taken from the first placemark that has it
+NETWORK_FIELDS = ('ssid', 'frequency', 'capabilities', 'network_type')
+
+class NetworkAggregator:
+    """
+    One-pass roll-up of placemarks into one network row per BSSID
+    Networks are keyed by BSSID in a dict, so each placemark costs O(1).
+    Metadata comes from the first placemark that carries each field;
+    first_seen/last_seen, the best signal with its position and the
+    observation count come from the (validated) observations.
+    """
+
+    def __init__(self):
+        self.networks = {}
+
+    def network(self, bssid):
+        """Summary row of bssid, created on first sight"""
+        network = self.networks.get(bssid)
+        if network is None:
+            network = self.networks[bssid] = {
+                'bssid': bssid,
+                'ssid': None,
+                'frequency': None,
+                'capabilities': None,
+                'network_type': None,
+                'first_seen': None,
+                'last_seen': None,
+                'best_level': None,
+                'best_lat': None,
+                'best_lon': None,
+                'observation_count': 0
+            }
+        return network
+
+    def add_metadata(self, bssid, metadata):
+        """Fill the network fields still missing from one placemark's metadata"""
+        network = self.network(bssid)
+        for field, key in zip(NETWORK_FIELDS, ('ssid', 'frequency', 'capabilities', 'type')):
+            if network[field] is None:
+                network[field] = metadata.get(key)
+
+    def add_observation(self, location):
+        """Fold one location observation into its network's summary"""
+        network = self.network(location['bssid'])
+        network['observation_count'] += 1
+
+        seen = location.get('time')
+        if seen is not None:
+            if network['first_seen'] is None or seen < network['first_seen']:
+                network['first_seen'] = seen
+            if network['last_seen'] is None or seen > network['last_seen']:
+                network['last_seen'] = seen
+
+        level = location.get('level')
+        if level is not None and (network['best_level'] is None or level > network['best_level']):
+            network['best_level'] = level
+            network['best_lat'] = location['lat']
+            network['best_lon'] = location['lon']
+
+    def observe(self, locations):
+        """Pass locations through, folding each one in as it goes by"""
+        for location in locations:
+            self.add_observation(location)
+            yield location
+
+    def rows(self):
+        """
+        Network summaries in order of first appearance
+        Networks whose observations were all dropped by validation are left out
+        """
+        return [network for network in self.networks.values() if network['observation_count']]
+
+def iter_kml_locations(kml_path, aggregator):
+    """
+    Yield the location observations of a KML file, one per placemark
+    Placemarks are read incrementally, so the document tree is never held
+    in memory; each placemark's metadata is folded into aggregator as it
+    is read.
+    """
+    for pm in iter_placemarks(kml_path):
+        # Name (usually SSID or BSSID) and description (contains metadata)
+        name = pm.name
+        description = pm.description or ''
 
         # Extract coordinates
-        point = pm.find('.//kml:Point/kml:coordinates', NS)
-        if point is not None and point.text:
-            coords = point.text.strip().split(',')
+        if pm.coordinates:
+            coords = pm.coordinates.strip().split(',')
             if len(coords) >= 2:
                 lon = float(coords[0])
                 lat = float(coords[1])
@@ -45,9 +151,11 @@ def parse_kml_file(kml_path):
                 # Parse description for metadata
                 metadata = parse_description(description)
 
-                # Create location entry
-                location = {
-                    'bssid': metadata.get('bssid', name),
+                bssid = metadata.get('bssid', name)
+                aggregator.add_metadata(bssid, metadata)
+
+                yield {
+                    'bssid': bssid,
                     'ssid': metadata.get('ssid'),
                     'lat': lat,
                     'lon': lon,
@@ -58,84 +166,55 @@ def parse_kml_file(kml_path):
                     'network_type': metadata.get('type'),
                     'encryption_type': metadata.get('encryption')
                 }
-                locations.append(location)
 
-                # Create network entry (unique by BSSID)
-                network = {
-                    'bssid': metadata.get('bssid', name),
-                    'ssid': metadata.get('ssid'),
-                    'frequency': metadata.get('frequency'),
-                    'capabilities': metadata.get('capabilities'),
-                    'first_seen': metadata.get('first_seen'),
-                    'last_seen': metadata.get('last_seen'),
-                    'network_type': metadata.get('type')
-                }
-
-                # Only add unique networks
-                if not any(n['bssid'] == network['bssid'] for n in networks):
-                    networks.append(network)
-
-    return networks, locations
-
-def parse_description(desc):
-    """Parse KML description field for network metadata"""
-    metadata = {}
-
-    if not desc:
-        return metadata
-
-    # WiGLE KML format usually has key-value pairs
-    lines = desc.split('\n')
-    for line in lines:
-        if ':' in line:
-            key, value = line.split(':', 1)
-            key = key.strip().lower()
-            value = value.strip()
-
-            if key in ['bssid', 'mac', 'netid', 'network id']:
-                metadata['bssid'] = value
-            elif key == 'ssid':
-                metadata['ssid'] = value if value and value != '<hidden>' else None
-            elif key in ['signal', 'level', 'rssi']:
-                try:
-                    metadata['level'] = int(float(value.replace('dBm', '').strip()))
-                except:
-                    pass
-            elif key == 'frequency':
-                try:
-                    metadata['frequency'] = int(value.replace('MHz', '').strip())
-                except:
-                    pass
-            elif key in ['type', 'network_type']:
-                metadata['type'] = value
-            elif key in ['encryption', 'capabilities', 'security']:
-                metadata['encryption'] = value
-                metadata['capabilities'] = value
-            elif key == 'time':
-                try:
-                    # Try to parse ISO 8601 timestamp first
-                    from dateutil import parser as date_parser
-                    dt = date_parser.parse(value)
-                    metadata['time'] = int(dt.timestamp() * 1000)  # Convert to Unix milliseconds
-                except:
-                    try:
-                        # Fallback: try Unix milliseconds
-                        metadata['time'] = int(value)
-                    except:
-                        pass
-            elif key == 'accuracy':
-                try:
-                    metadata['accuracy'] = float(value.replace('m', '').strip())
-                except:
-                    pass
-            elif key == 'attributes':
-                # Store Bluetooth attributes
-                metadata['attributes'] = value
-
-    return metadata
-
-def load_to_database(kml_filename, networks, locations, db_config):
-    """Load parsed KML data into PostgreSQL staging tables"""
+def parse_kml_file(kml_path, validator=None):
+    """
+    Parse a KML file lazily, in bounded batches
+    Locations are passed through validator (if given) one batch at a time
+    and rolled up into the per-BSSID network summaries as they are
+    consumed, so memory holds one validation batch plus one summary per
+    network. The network summaries are complete once locations is
+    exhausted.
+    Returns (aggregator, locations), locations being a one-shot iterator
+    """
+    aggregator = NetworkAggregator()
+    locations = iter_kml_locations(kml_path, aggregator)
+    if validator is not None:
+        locations = validator.stream(locations)
+    return aggregator, aggregator.observe(locations)
+
+def location_rows(kml_filename, locations):
+    """kml_locations_staging rows of locations, in LOCATION_COLUMNS order"""
+    for location in locations:
+        yield (
+            1,
+            location['bssid'],
+            location.get('level'),
+            location['lat'],
+            location['lon'],
+            location.get('altitude', 0.0),
+            location.get('accuracy'),
+            location.get('time'),
+            kml_filename,
+            location.get('ssid'),
+            location.get('network_type'),
+            location.get('encryption_type')
+        )
+
+def load_to_database(kml_filename, aggregator, locations, db_config, batch_size=LOCATION_BATCH_SIZE):
+    """
+    Load parsed KML data into PostgreSQL staging tables
+    Locations are COPYed into a temp table in batches of batch_size as they
+    are parsed and merged into kml_locations_staging, skipping duplicates;
+    then the network summaries (complete once locations is exhausted) are
+    upserted. Everything commits as one transaction. Needs the summary
+    columns from schema/kml_network_summary.sql.
+    A network already staged keeps its earliest first_seen, latest
+    last_seen and strongest signal, and its observation_count grows only
+    by the locations the merge actually inserted, so re-importing a file
+    changes neither.
+    Returns {'networks': n, 'locations': n, 'duplicates': n}
+    """
     conn = psycopg2.connect(**db_config)
     cur = conn.cursor()
 
@@ -143,58 +222,57 @@ def load_to_database(kml_filename, networks, locations, db_config):
     locations_inserted = 0
 
     try:
-        # Insert networks
-        for network in networks:
-            try:
-                cur.execute("""
-                    INSERT INTO app.kml_networks_staging
-                    (bssid, ssid, frequency, capabilities, first_seen, last_seen, kml_filename, network_type)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (bssid, ssid) DO UPDATE SET
-                        frequency = COALESCE(EXCLUDED.frequency, app.kml_networks_staging.frequency),
-                        last_seen = GREATEST(EXCLUDED.last_seen, app.kml_networks_staging.last_seen)
-                """, (
-                    network['bssid'],
-                    network.get('ssid'),
-                    network.get('frequency'),
-                    network.get('capabilities'),
-                    network.get('first_seen'),
-                    network.get('last_seen'),
-                    kml_filename,
-                    network.get('network_type')
-                ))
-                networks_inserted += 1
-            except Exception as e:
-                print(f"Error inserting network {network['bssid']}: {e}")
-                continue
-
-        # Insert locations
-        for location in locations:
-            try:
-                cur.execute("""
-                    INSERT INTO app.kml_locations_staging
-                    (source_id, bssid, level, lat, lon, altitude, accuracy, time, kml_filename, ssid, network_type, encryption_type)
-                    VALUES (1, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    location['bssid'],
-                    location.get('level'),
-                    location['lat'],
-                    location['lon'],
-                    location.get('altitude', 0.0),
-                    location.get('accuracy'),
-                    location.get('time'),
-                    kml_filename,
-                    location.get('ssid'),
-                    location.get('network_type'),
-                    location.get('encryption_type')
-                ))
-                locations_inserted += 1
-            except Exception as e:
-                print(f"Error inserting location for {location['bssid']}: {e}")
-                continue
-
+        # Copy locations batch by batch, then merge them past the dedupe index
+        cur.execute(LOCATION_TEMP_TABLE)
+        locations_copied = copy_rows(cur, 'kml_locations_tmp', LOCATION_COLUMNS,
+                                     location_rows(kml_filename, locations), batch_size)
+        cur.execute(LOCATION_MERGE)
+        inserted = dict(cur.fetchall())
+        locations_inserted = sum(inserted.values())
+
+        # Upsert networks; any failure rolls back the whole file, locations included
+        for network in aggregator.rows():
+            cur.execute("""
+                INSERT INTO app.kml_networks_staging
+                (bssid, ssid, frequency, capabilities, first_seen, last_seen, kml_filename, network_type,
+                 best_level, best_lat, best_lon, observation_count)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (bssid, ssid) DO UPDATE SET
+                    frequency = COALESCE(EXCLUDED.frequency, app.kml_networks_staging.frequency),
+                    first_seen = LEAST(EXCLUDED.first_seen, app.kml_networks_staging.first_seen),
+                    last_seen = GREATEST(EXCLUDED.last_seen, app.kml_networks_staging.last_seen),
+                    best_lat = CASE WHEN app.kml_networks_staging.best_level IS NULL
+                                      OR EXCLUDED.best_level > app.kml_networks_staging.best_level
+                                    THEN EXCLUDED.best_lat ELSE app.kml_networks_staging.best_lat END,
+                    best_lon = CASE WHEN app.kml_networks_staging.best_level IS NULL
+                                      OR EXCLUDED.best_level > app.kml_networks_staging.best_level
+                                    THEN EXCLUDED.best_lon ELSE app.kml_networks_staging.best_lon END,
+                    best_level = GREATEST(EXCLUDED.best_level, app.kml_networks_staging.best_level),
+                    observation_count = COALESCE(app.kml_networks_staging.observation_count, 0)
+                                        + EXCLUDED.observation_count
+            """, (
+                network['bssid'],
+                network.get('ssid'),
+                network.get('frequency'),
+                network.get('capabilities'),
+                network.get('first_seen'),
+                network.get('last_seen'),
+                kml_filename,
+                network.get('network_type'),
+                network['best_level'],
+                network['best_lat'],
+                network['best_lon'],
+                inserted.get(network['bssid'], 0)
+            ))
+            networks_inserted += 1
+
+        # A statement that failed inside the transaction would make COMMIT a
+        # silent rollback
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+            raise psycopg2.DatabaseError(f"transaction not committable (status {conn.get_transaction_status()})")
         conn.commit()
-        print(f"✓ Loaded {kml_filename}: {networks_inserted} networks, {locations_inserted} locations")
+        print(f"✓ Loaded {kml_filename}: {networks_inserted} networks, {locations_inserted} locations "
+              f"({locations_copied - locations_inserted} duplicates skipped)")
 
     except Exception as e:
         conn.rollback()
@@ -204,11 +282,12 @@ def load_to_database(kml_filename, networks, locations, db_config):
         cur.close()
         conn.close()
 
-    return {'networks': networks_inserted, 'locations': locations_inserted}
+    return {'networks': networks_inserted, 'locations': locations_inserted,
+            'duplicates': locations_copied - locations_inserted}
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: kml_parser.py <kml_file>")
+        print("Usage: kml_parser.py <file.kml, .kmz, .kml.gz, .kml.xz or .kml.zst>")
         sys.exit(1)
 
     kml_file = sys.argv[1]
@@ -227,12 +306,15 @@ def main():
     }
 
     print(f"Parsing {kml_file}...")
-    networks, locations = parse_kml_file(kml_file)
-
-    print(f"Found {len(networks)} unique networks, {len(locations)} location observations")
+    # Drop observations with unusable positions, clear implausible values
+    validator = ObservationValidator(altitude='altitude', accuracy='accuracy', level='level', time='time')
+    aggregator, locations = parse_kml_file(kml_file, validator)
 
     kml_filename = os.path.basename(kml_file)
-    result = load_to_database(kml_filename, networks, locations, db_config)
+    result = load_to_database(kml_filename, aggregator, locations, db_config)
+
+    print(f"Found {len(aggregator.rows())} unique networks, {result['locations'] + result['duplicates']} location observations")
+    print(f"Validation: {validator.summary()}")
 
     # Output JSON for API response
     import json
@@ -1,142 +1,325 @@
 #!/usr/bin/env python3
-import xml.etree.ElementTree as ET
 import re
-from datetime import datetime, timezone
 import sys
 import glob
+import gzip
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import repeat
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from kml_description import parse_description, parse_wigle_description
+from kml_stream import is_kml_file, iter_placemarks, kml_stem
+from pg_copy import copy_value
+from validation import ObservationValidator
 
 # --- CONFIGURATION ---
-SOURCE_DIR = "raw_kml"  # Directory containing multiple KML files
+SOURCE_DIR = "raw_kml"  # Directory containing multiple KML files (.kml, .kmz, .kml.gz/.xz/.zst)
 OUTPUT_DIR = "new_kml_files"  # Directory for generated SQL files
 TARGET_SOURCE_ID = 5  # Set your actual source_id here (e.g., 5)
 DEBUG = True  # Set to True for debugging output
+OUTPUT_FORMATS = ('sql',)  # Any of 'sql', 'tsv' (COPY text), 'csv' (COPY CSV); --format sql,tsv
+COMPRESS_COPY = False  # gzip the TSV/CSV files (.tsv.gz/.csv.gz); --gzip
+WORKERS = 1  # Files converted in parallel (one process each); --workers N
 # --- END CONFIGURATION ---
 
-# Regex for parsing description (from working script)
-DESC_REGEX = re.compile(
-    r"Network ID: ([\w:]{17})"       # 1. BSSID (exactly 17 chars)
-    r".*?Time: ([\d\-T:\.\+Z]+)"     # 2. Time (ISO 8601)
-    r".*?Signal: ([\-\d\.]+)"        # 3. Signal/Level (dBm)
-    r".*?Accuracy: ([\d\.]+)"        # 4. Accuracy (meters)
-    r".*?Type: ([\w]+)"              # 5. Network Type (WIFI, BLE, etc.)
-, re.DOTALL | re.MULTILINE)
+# Description fields every row needs (see shared/kml_description.py)
+REQUIRED_FIELDS = ('bssid', 'time', 'level', 'accuracy', 'type')
 
-print("--- KML Parser starting FULL extraction from multiple files in raw_kml/ ---", file=sys.stderr)
+# BSSID (exactly 17 chars) and network type (WIFI, BLE, etc.)
+BSSID_REGEX = re.compile(r"[\w:]{17}")
+TYPE_REGEX = re.compile(r"\w+")
 
 # UPDATED TARGET TABLE AND COLUMNS
-SQL_HEADER = (
-    "INSERT INTO app.kml_locations_staging (source_id, bssid, level, lat, lon, accuracy, time, kml_filename, ssid, network_type) VALUES"
-)
+TARGET_TABLE = "app.kml_locations_staging"
+COLUMNS = ('source_id', 'bssid', 'level', 'lat', 'lon', 'accuracy', 'time', 'kml_filename', 'ssid', 'network_type')
+SQL_HEADER = f"INSERT INTO {TARGET_TABLE} ({', '.join(COLUMNS)}) VALUES"
+
+# COPY statement that loads each output format (feed the file on STDIN)
+COPY_STATEMENTS = {
+    'tsv': f"COPY {TARGET_TABLE} ({', '.join(COLUMNS)}) FROM STDIN",
+    'csv': f"COPY {TARGET_TABLE} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+}
+
+MANIFEST_FILE = "manifest.json"
+
+# Placeholder names WiGLE uses when a network has no SSID
+NO_SSID_NAMES = ('(no SSID)', 'Encryption:', 'Attributes: Misc', '(No Name)', 'WEP', 'WPA', 'WPA2')
+
+def sql_value(value):
+    """SQL literal: NULL for None, quoted and escaped for text"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, str):
+        escaped = value.replace("'", "''")
+        return f"'{escaped}'"
+    return str(value)
+
+def csv_value(value):
+    """COPY CSV field: unquoted empty for NULL, text always quoted"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        escaped = value.replace('"', '""')
+        return f'"{escaped}"'
+    return str(value)
+
+def sql_line(row):
+    return "(" + ", ".join(sql_value(value) for value in row) + ")"
+
+def tsv_line(row):
+    return "\t".join(copy_value(value) for value in row) + "\n"
+
+def csv_line(row):
+    return ",".join(csv_value(value) for value in row) + "\n"
+
+COPY_LINES = {'tsv': tsv_line, 'csv': csv_line}
+
+def checked_description(desc_text, kml_file):
+    """
+    Metadata of any other description layout, with the REQUIRED_FIELDS
+    present and bssid/type cut to their expected shape
+    Returns None (after reporting why) if the placemark has to be skipped
+    """
+    metadata = parse_description(desc_text)
+    missing = [field for field in REQUIRED_FIELDS if field not in metadata]
+    bssid_match = BSSID_REGEX.match(metadata.get('bssid', ''))
+    type_match = TYPE_REGEX.match(metadata.get('type', ''))
+    if missing == ['time'] and bssid_match and type_match:
+        print(f"-- WARNING: Could not parse time for BSSID {bssid_match.group()} in {kml_file}", file=sys.stderr)
+        return None
+    if missing or not bssid_match or not type_match:
+        if DEBUG:
+            print(f"-- DEBUG: No regex match in {kml_file} for placemark description: {desc_text[:100]}...", file=sys.stderr)
+        return None
+    metadata['bssid'] = bssid_match.group()
+    metadata['type'] = type_match.group()
+    return metadata
 
 def parse_kml(kml_file):
-    try:
-        tree = ET.parse(kml_file)
-    except FileNotFoundError:
+    """
+    Rows of one KML file in COLUMNS order
+    Returns a one-shot iterator that reads, validates and yields the rows
+    batch by batch, or None if the file does not exist
+    """
+    if not os.path.exists(kml_file):
         print(f"-- ERROR: KML file '{kml_file}' not found. Skipping.", file=sys.stderr)
         return None
 
-    root = tree.getroot()
-    ns = {'ns': 'http://www.opengis.net/kml/2.2'}
-    inserts = []
+    return iter_rows(kml_file)
+
+def iter_rows(kml_file):
+    """Yield the validated row tuples of kml_file, then report the validation counts"""
+    # Validate positions/signal/time a batch at a time, then create the row tuples
+    validator = ObservationValidator(accuracy='accuracy', level='level', time='time')
+    kml_filename = os.path.basename(kml_file)
+    for record in validator.stream(iter_records(kml_file)):
+        yield (TARGET_SOURCE_ID, record['bssid'], record['level'], record['lat'], record['lon'],
+               record['accuracy'], record['time'], kml_filename, record['ssid'], record['network_type'])
+    print(f"-- Validation {kml_file}: {validator.summary()}", file=sys.stderr)
+
+def iter_records(kml_file):
+    """Yield the matching placemarks of kml_file as records, reporting counts at the end"""
     placemark_count = 0
     match_count = 0
     
-    placemarks = root.findall('.//ns:Placemark', ns)
-    if not placemarks:
-        print(f"-- WARNING: No Placemarks found in {kml_file}.", file=sys.stderr)
-    
-    for placemark in placemarks:
+    # Placemarks are streamed one at a time instead of building the whole tree
+    for placemark in iter_placemarks(kml_file):
         placemark_count += 1
-        name_tag = placemark.find('ns:name', ns)
-        desc_tag = placemark.find('ns:description', ns)
-        coord_tag = placemark.find('ns:Point/ns:coordinates', ns)
         
-        if desc_tag is None or coord_tag is None:
+        if placemark.description is None or placemark.coordinates is None:
             if DEBUG:
                 print(f"-- DEBUG: Skipping placemark in {kml_file} - missing description or coordinates.", file=sys.stderr)
             continue
             
-        desc_text = desc_tag.text or ''
-        match = DESC_REGEX.search(desc_text)
-        if not match:
-            if DEBUG:
-                print(f"-- DEBUG: No regex match in {kml_file} for placemark description: {desc_text[:100]}...", file=sys.stderr)
-            continue
+        desc_text = placemark.description
+        # WiGLE's own layout: the regex already checked the BSSID, type,
+        # signal and accuracy, leaving only the time to fail
+        metadata = parse_wigle_description(desc_text)
+        if metadata is None or 'time' not in metadata:
+            metadata = checked_description(desc_text, kml_file)
+            if metadata is None:
+                continue
         match_count += 1
             
-        # Unpack the 5 captured groups from the Regex match
-        bssid, time_iso, level, accuracy, network_type = match.groups()
+        bssid = metadata['bssid']
+        network_type = metadata['type']
         
         # 1. Extract SSID from <name> - Robustly check for tag text content to avoid NoneType.strip()
-        if name_tag is not None and name_tag.text is not None:
-            ssid = name_tag.text.strip()
+        if placemark.name is not None:
+            ssid = placemark.name.strip()
         else:
             ssid = "(No Name)"
         
-        # Clean and escape the SSID for SQL insertion
-        if ssid in ('(no SSID)', 'Encryption:', 'Attributes: Misc', '(No Name)', 'WEP', 'WPA', 'WPA2'):
-            ssid_sql = 'NULL'
-        else:
-            # Correctly perform string escaping outside of the f-string expression
-            escaped_ssid = ssid.replace("'", "''")
-            ssid_sql = f"'{escaped_ssid}'"
+        # Placeholder names are stored as NULL
+        if ssid in NO_SSID_NAMES:
+            ssid = None
             
         # 2. Extract Lon and Lat
         try:
             # KML order is LON, LAT, ALT
-            lon_str, lat_str, *alt_str = coord_tag.text.strip().split(',')
+            lon_str, lat_str, *alt_str = placemark.coordinates.strip().split(',')
         except ValueError:
             # Handle cases where only Lon, Lat are present
-            lon_str, lat_str = coord_tag.text.strip().split(',')
+            lon_str, lat_str = placemark.coordinates.strip().split(',')
         
-        # 3. Convert ISO 8601 Time to Epoch Milliseconds
-        try:
-            dt_obj = datetime.fromisoformat(time_iso)
-            epoch_seconds = dt_obj.astimezone(timezone.utc).timestamp()
-            epoch_milliseconds = int(epoch_seconds * 1000)
-        except ValueError:
-            print(f"-- WARNING: Could not parse time for BSSID {bssid} in {kml_file}", file=sys.stderr)
-            continue
-            
-        # 4. Create the comprehensive SQL VALUES tuple string
-        insert_line = (
-            f"({TARGET_SOURCE_ID}, '{bssid}', {int(float(level))}, {float(lat_str)}, "
-            f"{float(lon_str)}, {float(accuracy)}, {epoch_milliseconds}, '{os.path.basename(kml_file)}', {ssid_sql}, '{network_type}')"
-        )
-        inserts.append(insert_line)
+        # 3. Time was converted from ISO 8601 to epoch milliseconds by parse_description
+        yield {
+            'bssid': bssid,
+            'level': metadata['level'],
+            'lat': float(lat_str),
+            'lon': float(lon_str),
+            'accuracy': metadata['accuracy'],
+            'time': metadata['time'],
+            'ssid': ssid,
+            'network_type': network_type
+        }
     
+    if not placemark_count:
+        print(f"-- WARNING: No Placemarks found in {kml_file}.", file=sys.stderr)
+
     if DEBUG:
         print(f"-- DEBUG: {placemark_count} placemarks found, {match_count} matched in {kml_file}", file=sys.stderr)
-    
-    return inserts
+
+class SqlWriter:
+    """
+    Write rows as one multi-row INSERT statement, one row at a time
+    The file is only created once there is a row, since an INSERT needs at
+    least one VALUES tuple; a stale file from an earlier run is removed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.rows = 0
+
+    def write(self, row):
+        if self.file is None:
+            self.file = open(self.path, 'w')
+            self.file.write(SQL_HEADER + "\n")
+        else:
+            self.file.write(",\n")
+        self.file.write(sql_line(row))
+        self.rows += 1
+
+    def close(self):
+        if self.file is None:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        self.file.write(";\n")
+        self.file.close()
+
+class CopyWriter:
+    """Write rows as COPY-ready TSV (text format) or CSV, optionally gzipped"""
+
+    def __init__(self, path, fmt, compress=False):
+        self.format_line = COPY_LINES[fmt]
+        opener = gzip.open if compress else open
+        self.file = opener(path, 'wt', encoding='utf-8', newline='')
+
+    def write(self, row):
+        self.file.write(self.format_line(row))
+
+    def close(self):
+        self.file.close()
+
+def convert_file(kml_file, formats=OUTPUT_FORMATS, compress=COMPRESS_COPY):
+    """
+    Convert one KML file into each requested output format
+    Rows are written to every output as they are parsed, in a single pass.
+    Returns its manifest entry, or None if the file was skipped
+    """
+    rows = parse_kml(kml_file)
+    if rows is None:
+        return None
+
+    base_name = kml_stem(kml_file)
+    outputs = {}
+    writers = []
+    for fmt in formats:
+        if fmt == 'sql':
+            filename = f"{base_name}.sql"
+            writers.append(SqlWriter(os.path.join(OUTPUT_DIR, filename)))
+        else:
+            filename = f"{base_name}.{fmt}" + (".gz" if compress else "")
+            writers.append(CopyWriter(os.path.join(OUTPUT_DIR, filename), fmt, compress))
+        outputs[fmt] = filename
+
+    count = 0
+    try:
+        for row in rows:
+            for writer in writers:
+                writer.write(row)
+            count += 1
+    finally:
+        for writer in writers:
+            writer.close()
+
+    # No rows, no INSERT: the SQL output is left out of the manifest
+    if not count and 'sql' in outputs:
+        print(f"-- WARNING: No rows in {kml_file}; no SQL file written.", file=sys.stderr)
+        del outputs['sql']
+
+    for fmt, filename in outputs.items():
+        print(f"--- Generated {fmt.upper()} file: {os.path.join(OUTPUT_DIR, filename)} with {count} rows ---", file=sys.stderr)
+
+    return {'source': os.path.basename(kml_file), 'rows': count, 'outputs': outputs}
+
+def write_manifest(entries, formats, compress):
+    """Write OUTPUT_DIR/manifest.json with per-file row counts and the COPY statements"""
+    manifest = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'table': TARGET_TABLE,
+        'columns': list(COLUMNS),
+        'source_id': TARGET_SOURCE_ID,
+        'formats': list(formats),
+        'compressed': compress,
+        'copy': {fmt: COPY_STATEMENTS[fmt] for fmt in formats if fmt in COPY_STATEMENTS},
+        'files': entries,
+        'total_rows': sum(entry['rows'] for entry in entries)
+    }
+    path = os.path.join(OUTPUT_DIR, MANIFEST_FILE)
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    return path
 
 if __name__ == '__main__':
+    print("--- KML Parser starting FULL extraction from multiple files in raw_kml/ ---", file=sys.stderr)
+
+    formats = OUTPUT_FORMATS
+    if '--format' in sys.argv:
+        formats = tuple(sys.argv[sys.argv.index('--format') + 1].split(','))
+    unknown = [fmt for fmt in formats if fmt != 'sql' and fmt not in COPY_LINES]
+    if unknown:
+        print(f"-- ERROR: Unknown output format(s) {', '.join(unknown)}; use sql, tsv or csv.", file=sys.stderr)
+        sys.exit(1)
+    compress = COMPRESS_COPY or '--gzip' in sys.argv
+    workers = WORKERS
+    if '--workers' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('--workers') + 1])
+
     # Create output directory if not exists
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
-    kml_files = glob.glob(os.path.join(SOURCE_DIR, '*.kml'))
+    kml_files = sorted(f for f in glob.glob(os.path.join(SOURCE_DIR, '*')) if is_kml_file(f))
     if not kml_files:
         print(f"-- ERROR: No KML files found in {SOURCE_DIR}. Exiting.", file=sys.stderr)
         sys.exit(1)
     
-    total_rows = 0
-    for kml_file in kml_files:
-        inserts = parse_kml(kml_file)
-        if inserts is None:
-            continue
-        
-        # Output SQL file per input KML
-        base_name = os.path.basename(kml_file).rsplit('.', 1)[0]
-        output_sql_file = os.path.join(OUTPUT_DIR, f"{base_name}.sql")
-        
-        with open(output_sql_file, 'w') as f:
-            f.write(SQL_HEADER + "\n")
-            for i, line in enumerate(inserts):
-                f.write(line + (",\n" if i < len(inserts) - 1 else ";\n"))
-        
-        rows = len(inserts)
-        total_rows += rows
-        print(f"--- Generated SQL file: {output_sql_file} with {rows} rows ---", file=sys.stderr)
-    
-    print(f"--- Processed {len(kml_files)} files, {total_rows} total rows ---", file=sys.stderr)
+    # Files are independent: convert them across a process pool
+    workers = max(1, min(workers, len(kml_files)))
+    if workers == 1:
+        results = [convert_file(kml_file, formats, compress) for kml_file in kml_files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(convert_file, kml_files, repeat(formats), repeat(compress)))
+
+    entries = [entry for entry in results if entry is not None]
+    manifest_path = write_manifest(entries, formats, compress)
+
+    total_rows = sum(entry['rows'] for entry in entries)
+    print(f"--- Processed {len(kml_files)} files, {total_rows} total rows (manifest: {manifest_path}) ---", file=sys.stderr)
@@ -0,0 +1,550 @@
+"""
+Async Safe Ingestion Helpers
+asyncio counterpart of SafeIngester built on asyncpg
+
+Batch methods split their input into chunks and keep several chunks in
+flight over a small connection pool, so parsing the next chunk overlaps
+with PostgreSQL inserting the previous ones. Deduplication still happens
+in the app.safe_insert_* functions and ON CONFLICT keys.
+"""
+
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import time
+from datetime import datetime
+from typing import (
+    Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional,
+    Sequence, Union
+)
+
+import asyncpg
+
+try:
+    from .seen_set import SeenSets
+    from .safe_ingest import (
+        KML_CHUNK_SIZE,
+        LEGACY_COPY_COLUMNS,
+        LEGACY_COPY_MERGE,
+        LEGACY_COPY_TEMP_TABLE,
+        WIGLE_API_COPY_COLUMNS,
+        WIGLE_API_COPY_MERGE,
+        WIGLE_API_COPY_TEMP_TABLE,
+        SafeIngestStats,
+    )
+except ImportError:
+    from seen_set import SeenSets
+    from safe_ingest import (
+        KML_CHUNK_SIZE,
+        LEGACY_COPY_COLUMNS,
+        LEGACY_COPY_MERGE,
+        LEGACY_COPY_TEMP_TABLE,
+        WIGLE_API_COPY_COLUMNS,
+        WIGLE_API_COPY_MERGE,
+        WIGLE_API_COPY_TEMP_TABLE,
+        SafeIngestStats,
+    )
+
+logger = logging.getLogger(__name__)
+
+Observations = Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
+# Set-based equivalents of the per-row loops in SafeIngester: one statement
+# per chunk calls the same safe_insert function for every unnested row
+LEGACY_BATCH_SQL = """
+    SELECT COALESCE(SUM(app.safe_insert_legacy_location(
+        t.bssid, t.level, t.lat, t.lon, t.altitude, t.accuracy, t.time, t.source_id
+    )), 0)
+    FROM unnest(
+        $1::text[], $2::integer[], $3::double precision[], $4::double precision[],
+        $5::double precision[], $6::double precision[], $7::bigint[], $8::integer[]
+    ) AS t(bssid, level, lat, lon, altitude, accuracy, time, source_id)
+"""
+
+WIGLE_API_BATCH_SQL = """
+    SELECT COALESCE(SUM(app.safe_insert_wigle_api_location(
+        t.bssid, t.signal_level, t.lat, t.lon, t.altitude, t.accuracy, t.time, t.query_params
+    )), 0)
+    FROM unnest(
+        $1::text[], $2::integer[], $3::double precision[], $4::double precision[],
+        $5::double precision[], $6::double precision[], $7::timestamptz[], $8::jsonb[]
+    ) AS t(bssid, signal_level, lat, lon, altitude, accuracy, time, query_params)
+"""
+
+
+async def _achunked(items: Observations, size: int):
+    """Yield lists of at most size items from a sync or async iterable"""
+    if hasattr(items, "__aiter__"):
+        chunk: List[Any] = []
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+        return
+
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+        # Let in-flight inserts make progress between synchronous chunks
+        await asyncio.sleep(0)
+
+
+def _payload_size(rows: List[Sequence[Any]]) -> int:
+    """Approximate text-encoded size of rows sent to the server"""
+    return sum(len(str(value)) + 1 for row in rows for value in row)
+
+
+def _timed(method: Callable[..., Awaitable[SafeIngestStats]]):
+    """Set wall_time on the stats returned by an async batch method"""
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs) -> SafeIngestStats:
+        started = time.perf_counter()
+        stats = await method(*args, **kwargs)
+        stats.wall_time = time.perf_counter() - started
+        return stats
+    return wrapper
+
+
+def _rowcount(status: str) -> int:
+    """Row count from an asyncpg command status such as 'INSERT 0 42'"""
+    try:
+        return int(status.rsplit(" ", 1)[-1])
+    except (ValueError, AttributeError):
+        return 0
+
+
+class AsyncSafeIngester:
+    """
+    Handles safe ingestion with deduplication on asyncio
+
+    Usage:
+        async with AsyncSafeIngester(dsn) as ingester:
+            stats = await ingester.batch_insert_kml_observations(rows)
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        pool_size: int = 4,
+        min_connections: int = 1,
+        max_in_flight: Optional[int] = None,
+        seen_set_dir: Optional[str] = None
+    ):
+        self.connection_string = connection_string
+        self.pool_size = max(1, pool_size)
+        self.min_connections = min(max(0, min_connections), self.pool_size)
+        # Keeping at most one chunk per connection in flight bounds memory
+        self.max_in_flight = max(1, max_in_flight or self.pool_size)
+
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+
+        # Optional persistent fingerprints of already ingested observations
+        self.seen_sets = SeenSets(seen_set_dir) if seen_set_dir else None
+
+    async def __aenter__(self) -> "AsyncSafeIngester":
+        await self._get_pool()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close every pooled connection and compact the seen-sets"""
+        async with self._pool_lock:
+            if self._pool is not None:
+                await self._pool.close()
+            self._pool = None
+        if self.seen_sets is not None:
+            self.seen_sets.close()
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        """Create the connection pool on first use"""
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(
+                    self.connection_string,
+                    min_size=self.min_connections,
+                    max_size=self.pool_size
+                )
+            return self._pool
+
+    async def _filtered(
+        self,
+        source: str,
+        chunk: List[Dict[str, Any]],
+        insert_chunk: Callable[[List[Dict[str, Any]]], Awaitable[SafeIngestStats]]
+    ) -> SafeIngestStats:
+        """
+        Drop chunk rows the seen-set already knows, insert the rest and
+        record their fingerprints once committed
+        """
+        if self.seen_sets is None:
+            return await insert_chunk(chunk)
+
+        chunk, fingerprints, known = self.seen_sets.partition(source, chunk)
+        stats = await insert_chunk(chunk) if chunk else SafeIngestStats()
+        if fingerprints:
+            self.seen_sets.commit(source, fingerprints)
+        return stats.merge(SafeIngestStats(total=known, known_duplicates=known))
+
+    async def _insert_one(
+        self,
+        source: str,
+        obs: Dict[str, Any],
+        insert: Callable[[], Awaitable[int]]
+    ) -> bool:
+        """Single-row insert through the seen-set filter"""
+        async def insert_chunk(chunk: List[Dict[str, Any]]) -> SafeIngestStats:
+            inserted = 1 if await insert() > 0 else 0
+            return SafeIngestStats(total=1, inserted=inserted, duplicates=1 - inserted)
+
+        stats = await self._filtered(source, [obs], insert_chunk)
+        return stats.inserted > 0
+
+    async def _pipeline(
+        self,
+        observations: Observations,
+        chunk_size: int,
+        source: str,
+        insert_chunk: Callable[[List[Dict[str, Any]]], Awaitable[SafeIngestStats]]
+    ) -> SafeIngestStats:
+        """
+        Run insert_chunk over successive chunks with up to max_in_flight
+        chunks executing concurrently
+        Returns the merged statistics
+        """
+        stats = SafeIngestStats()
+        in_flight = set()
+
+        try:
+            async for chunk in _achunked(observations, max(1, chunk_size)):
+                if len(in_flight) >= self.max_in_flight:
+                    done, in_flight = await asyncio.wait(
+                        in_flight, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        stats.merge(task.result())
+                in_flight.add(asyncio.ensure_future(
+                    self._filtered(source, chunk, insert_chunk)
+                ))
+
+            for result in await asyncio.gather(*in_flight):
+                stats.merge(result)
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            raise
+
+        return stats
+
+    async def _copy_merge(
+        self,
+        rows: List[Sequence[Any]],
+        temp_table_sql: str,
+        temp_table: str,
+        columns: Sequence[str],
+        merge_sql: str
+    ) -> SafeIngestStats:
+        """
+        COPY rows into a session temp table, then merge them into the target
+        with a single ON CONFLICT DO NOTHING insert
+        Returns statistics
+        """
+        pool = await self._get_pool()
+        started = time.perf_counter()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(temp_table_sql)
+                await conn.copy_records_to_table(
+                    temp_table, records=rows, columns=list(columns)
+                )
+                inserted = _rowcount(await conn.execute(merge_sql))
+
+        stats = SafeIngestStats(
+            total=len(rows),
+            inserted=inserted,
+            duplicates=len(rows) - inserted
+        )
+        stats.record_batch(
+            time.perf_counter() - started,
+            _payload_size(rows) + len(temp_table_sql) + len(merge_sql)
+        )
+        return stats
+
+    async def _batch_call(
+        self,
+        sql: str,
+        columns: List[List[Any]],
+        total: int
+    ) -> SafeIngestStats:
+        """Run a set-based safe_insert statement over column arrays"""
+        pool = await self._get_pool()
+        started = time.perf_counter()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                inserted = int(await conn.fetchval(sql, *columns))
+
+        stats = SafeIngestStats(
+            total=total,
+            inserted=inserted,
+            duplicates=total - inserted
+        )
+        stats.record_batch(
+            time.perf_counter() - started, _payload_size(columns) + len(sql)
+        )
+        return stats
+
+    async def insert_kml_observation(
+        self,
+        bssid: str,
+        ssid: Optional[str],
+        network_type: str,
+        encryption_type: Optional[str],
+        level: int,
+        lat: float,
+        lon: float,
+        altitude: Optional[float],
+        accuracy: Optional[float],
+        time_ms: int,
+        kml_filename: str,
+        source_id: Optional[int] = None
+    ) -> bool:
+        """
+        Insert single KML observation
+        Returns True if inserted, False if duplicate
+        """
+        pool = await self._get_pool()
+
+        async def insert() -> int:
+            return await pool.fetchval(
+                """
+                SELECT app.safe_insert_kml_location(
+                    $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12
+                )
+                """,
+                bssid, ssid, network_type, encryption_type,
+                level, lat, lon, altitude, accuracy,
+                time_ms, kml_filename, source_id
+            )
+
+        return await self._insert_one("kml", {
+            "bssid": bssid, "time": time_ms, "lat": lat, "lon": lon,
+            "level": level, "kml_filename": kml_filename
+        }, insert)
+
+    @_timed
+    async def batch_insert_kml_observations(
+        self,
+        observations: Observations,
+        chunk_size: int = KML_CHUNK_SIZE
+    ) -> SafeIngestStats:
+        """
+        Batch insert KML observations with deduplication
+        Accepts sync or async iterables; each chunk commits independently
+        Returns statistics about inserted vs duplicate rows
+        """
+        pool = await self._get_pool()
+
+        async def insert_chunk(chunk: List[Dict[str, Any]]) -> SafeIngestStats:
+            payload = json.dumps(chunk)
+            started = time.perf_counter()
+            result = await pool.fetchval(
+                "SELECT app.batch_insert_kml_locations($1::jsonb)",
+                payload
+            )
+            result = json.loads(result)
+            stats = SafeIngestStats(
+                total=result["total"],
+                inserted=result["inserted"],
+                duplicates=result["duplicates"]
+            )
+            stats.record_batch(time.perf_counter() - started, len(payload))
+            return stats
+
+        return await self._pipeline(observations, chunk_size, "kml", insert_chunk)
+
+    async def insert_wigle_api_observation(
+        self,
+        bssid: str,
+        signal_level: int,
+        lat: float,
+        lon: float,
+        altitude: Optional[float],
+        accuracy: Optional[float],
+        time: datetime,
+        query_params: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Insert single WiGLE API observation
+        Returns True if inserted, False if duplicate
+        """
+        pool = await self._get_pool()
+
+        async def insert() -> int:
+            return await pool.fetchval(
+                """
+                SELECT app.safe_insert_wigle_api_location(
+                    $1, $2, $3, $4, $5, $6, $7, $8::jsonb
+                )
+                """,
+                bssid, signal_level, lat, lon,
+                altitude, accuracy, time,
+                json.dumps(query_params) if query_params else None
+            )
+
+        return await self._insert_one("wigle_api", {
+            "bssid": bssid, "time": time, "lat": lat, "lon": lon,
+            "signal_level": signal_level
+        }, insert)
+
+    @_timed
+    async def batch_insert_wigle_api_observations(
+        self,
+        observations: Observations,
+        use_copy: bool = False,
+        chunk_size: int = KML_CHUNK_SIZE
+    ) -> SafeIngestStats:
+        """
+        Batch insert WiGLE API observations
+        With use_copy=True each chunk is COPY-streamed and merged in one statement
+        Returns statistics
+        """
+        def to_row(obs: Dict[str, Any]) -> tuple:
+            return (
+                obs["bssid"],
+                obs["signal_level"],
+                obs["lat"],
+                obs["lon"],
+                obs.get("altitude"),
+                obs.get("accuracy"),
+                obs["time"],
+                json.dumps(obs["query_params"]) if obs.get("query_params") else None
+            )
+
+        async def insert_chunk(chunk: List[Dict[str, Any]]) -> SafeIngestStats:
+            rows = [to_row(obs) for obs in chunk]
+            if use_copy:
+                return await self._copy_merge(
+                    rows,
+                    WIGLE_API_COPY_TEMP_TABLE,
+                    "safe_ingest_wigle_api_tmp",
+                    WIGLE_API_COPY_COLUMNS,
+                    WIGLE_API_COPY_MERGE
+                )
+            return await self._batch_call(
+                WIGLE_API_BATCH_SQL, [list(col) for col in zip(*rows)], len(rows)
+            )
+
+        return await self._pipeline(observations, chunk_size, "wigle_api", insert_chunk)
+
+    async def insert_legacy_observation(
+        self,
+        bssid: str,
+        level: int,
+        lat: float,
+        lon: float,
+        altitude: Optional[float],
+        accuracy: Optional[float],
+        time_ms: int,
+        source_id: Optional[int] = None
+    ) -> bool:
+        """
+        Insert single legacy (SQLite) observation
+        Returns True if inserted, False if duplicate
+        """
+        pool = await self._get_pool()
+
+        async def insert() -> int:
+            return await pool.fetchval(
+                """
+                SELECT app.safe_insert_legacy_location(
+                    $1, $2, $3, $4, $5, $6, $7, $8
+                )
+                """,
+                bssid, level, lat, lon,
+                altitude, accuracy, time_ms, source_id
+            )
+
+        return await self._insert_one("legacy", {
+            "bssid": bssid, "time": time_ms, "lat": lat, "lon": lon,
+            "level": level, "source_id": source_id
+        }, insert)
+
+    @_timed
+    async def batch_insert_legacy_observations(
+        self,
+        observations: Observations,
+        use_copy: bool = False,
+        chunk_size: int = KML_CHUNK_SIZE
+    ) -> SafeIngestStats:
+        """
+        Batch insert legacy observations
+        With use_copy=True each chunk is COPY-streamed and merged in one statement
+        Returns statistics
+        """
+        def to_row(obs: Dict[str, Any]) -> tuple:
+            return (
+                obs["bssid"],
+                obs["level"],
+                obs["lat"],
+                obs["lon"],
+                obs.get("altitude"),
+                obs.get("accuracy"),
+                obs["time"],
+                obs.get("source_id")
+            )
+
+        async def insert_chunk(chunk: List[Dict[str, Any]]) -> SafeIngestStats:
+            rows = [to_row(obs) for obs in chunk]
+            if use_copy:
+                return await self._copy_merge(
+                    rows,
+                    LEGACY_COPY_TEMP_TABLE,
+                    "safe_ingest_legacy_tmp",
+                    LEGACY_COPY_COLUMNS,
+                    LEGACY_COPY_MERGE
+                )
+            return await self._batch_call(
+                LEGACY_BATCH_SQL, [list(col) for col in zip(*rows)], len(rows)
+            )
+
+        return await self._pipeline(observations, chunk_size, "legacy", insert_chunk)
+
+
+# Example usage
+if __name__ == "__main__":
+    import os
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    async def main():
+        async with AsyncSafeIngester(os.getenv("DATABASE_URL"), pool_size=4) as ingester:
+            stats = await ingester.batch_insert_legacy_observations(
+                (
+                    {
+                        "bssid": "AA:BB:CC:DD:EE:FF",
+                        "level": -65,
+                        "lat": 37.7749,
+                        "lon": -122.4194,
+                        "altitude": 10.0,
+                        "accuracy": 15.0,
+                        "time": 1640000000000 + i * 1000
+                    }
+                    for i in range(20000)
+                ),
+                use_copy=True
+            )
+            print(stats)
+
+    asyncio.run(main())
@@ -0,0 +1,222 @@
+"""
+KML Description Parser
+Single-pass tokenizer for the "Key: value" lines of WiGLE KML placemark
+descriptions, shared by the KML pipelines
+
+WiGLE's fixed six-line layout is matched by one compiled regex that also
+checks the BSSID and type shapes, and its dict is built directly; anything
+else goes through a line tokenizer whose keys are looked up in a table of
+aliases instead of an if/elif chain. Timestamps take a fast path
+for WiGLE's fixed ISO-8601 layout (2025-03-01T12:00:00.000-05:00), with
+the calendar conversion memoized per minute since consecutive placemarks
+share most of them. Other layouts fall back to fromisoformat(),
+then dateutil when installed, then epoch milliseconds.
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    from dateutil import parser as date_parser
+except ImportError:
+    date_parser = None
+
+# One "Key: value" line; the key ends at the first colon
+FIELD_REGEX = re.compile(r"([^:\n]+):([^\n]*)")
+
+# WiGLE's own description layout, matched in one step before falling back
+# to the line tokenizer
+WIGLE_REGEX = re.compile(
+    r"Network ID: ([\w:]{17})\n"   # BSSID (exactly 17 chars)
+    r"Encryption: ([^\n]*)\n"
+    r"Time: (?:(\d{4}-\d\d-\d\dT\d\d:\d\d):([0-5]\d)\.(\d{3})([+-]\d\d:\d\d)|([^\n]*))\n"
+    r"Signal: (-?\d+(?:\.\d+)?)\n"    # dBm
+    r"Accuracy: (\d+(?:\.\d+)?)\n"    # meters
+    r"Type: (\w+)\s*"               # network type (WIFI, BLE, etc.)
+)
+
+ISO_REGEX = re.compile(
+    r"(\d{4}-\d\d-\d\dT\d\d:\d\d)"       # 1. date and time to the minute
+    r":([0-5]\d)"                         # 2. second
+    r"(?:\.(\d+))?"                       # 3. fraction
+    r"(Z|[+-]\d\d:?\d\d)?$"               # 4. UTC offset
+)
+
+# Description key (lowercase) -> metadata field
+KEY_FIELDS = {
+    'bssid': 'bssid',
+    'mac': 'bssid',
+    'netid': 'bssid',
+    'network id': 'bssid',
+    'ssid': 'ssid',
+    'signal': 'level',
+    'level': 'level',
+    'rssi': 'level',
+    'frequency': 'frequency',
+    'type': 'type',
+    'network_type': 'type',
+    'encryption': 'encryption',
+    'capabilities': 'encryption',
+    'security': 'encryption',
+    'time': 'time',
+    'accuracy': 'accuracy',
+    'attributes': 'attributes',
+}
+
+# Distinct minutes remembered by the timestamp fast path (the memo is
+# emptied when full)
+TIMESTAMP_CACHE_SIZE = 1 << 16
+
+
+# "YYYY-MM-DDTHH:MM[+HH:MM]" -> epoch seconds; a plain dict, so a hit is one
+# lookup and a miss costs little more than fromisoformat() itself
+_MINUTES: Dict[str, int] = {}
+
+
+def _epoch_minute(minute: str) -> int:
+    """Epoch seconds of a "YYYY-MM-DDTHH:MM[+HH:MM]" minute (local time without an offset)"""
+    seconds = _MINUTES.get(minute)
+    if seconds is None:
+        if len(_MINUTES) >= TIMESTAMP_CACHE_SIZE:
+            _MINUTES.clear()
+        seconds = _MINUTES[minute] = int(datetime.fromisoformat(minute).timestamp())
+    return seconds
+
+
+def parse_timestamp(value: str) -> Optional[int]:
+    """
+    Parse a KML description time
+    Returns Unix milliseconds, or None if the value is not a time
+    """
+    value = value.strip()
+    match = ISO_REGEX.match(value)
+    if match:
+        minute, second, fraction, offset = match.groups()
+        if offset is None:
+            offset = ''
+        elif offset == 'Z':
+            offset = '+00:00'
+        elif len(offset) == 5:
+            offset = offset[:3] + ':' + offset[3:]
+        try:
+            millis = int(fraction[:3].ljust(3, '0')) if fraction else 0
+            return (_epoch_minute(minute + offset) + int(second)) * 1000 + millis
+        except ValueError:
+            return None
+
+    try:
+        dt = datetime.fromisoformat(value)
+        return int(dt.timestamp() * 1000)
+    except ValueError:
+        pass
+    if date_parser is not None:
+        try:
+            return int(date_parser.parse(value).timestamp() * 1000)
+        except (ValueError, OverflowError):
+            pass
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _level(value: str) -> int:
+    return int(float(value.replace('dBm', '')))
+
+
+def _accuracy(value: str) -> float:
+    return float(value.replace('m', ''))
+
+
+def _frequency(value: str) -> int:
+    return int(float(value.replace('MHz', '')))
+
+
+def _ssid(value: str) -> Optional[str]:
+    return value if value and value != '<hidden>' else None
+
+
+def _text(value: str) -> str:
+    return value
+
+
+# Metadata field -> converter (raises ValueError or returns None to skip)
+FIELD_CONVERTERS = {
+    'bssid': _text,
+    'ssid': _ssid,
+    'level': _level,
+    'frequency': _frequency,
+    'type': _text,
+    'encryption': _text,
+    'time': parse_timestamp,
+    'accuracy': _accuracy,
+    'attributes': _text,
+}
+
+
+def parse_wigle_description(desc: str) -> Optional[Dict[str, Any]]:
+    """
+    Fast path for WiGLE's own description layout
+    Returns the parse_description() dict, always with bssid, type,
+    encryption and capabilities, or None if desc is not in that layout
+    """
+    match = WIGLE_REGEX.fullmatch(desc.strip())
+    if match is None:
+        return None
+
+    bssid, encryption, minute, second, millis, offset, time, level, accuracy, network_type = match.groups()
+    encryption = encryption.strip()
+    metadata = {
+        'bssid': bssid,
+        'encryption': encryption,
+        'capabilities': encryption,
+        'level': int(float(level)),
+        'accuracy': float(accuracy),
+        'type': network_type
+    }
+    # WiGLE's own time layout skips ISO_REGEX; anything else goes through parse_timestamp
+    if minute is not None:
+        try:
+            metadata['time'] = (_epoch_minute(minute + offset) + int(second)) * 1000 + int(millis)
+        except ValueError:
+            pass
+    else:
+        time = parse_timestamp(time)
+        if time is not None:
+            metadata['time'] = time
+    return metadata
+
+
+def parse_description(desc: Optional[str]) -> Dict[str, Any]:
+    """
+    Parse KML description field for network metadata
+    Returns a dict with whichever of bssid, ssid, level, frequency, type,
+    encryption, capabilities, time (Unix ms), accuracy and attributes the
+    description carries; values that do not parse are left out
+    """
+    if not desc:
+        return {}
+
+    metadata = parse_wigle_description(desc)
+    if metadata is not None:
+        return metadata
+
+    metadata = {}
+    for key, value in FIELD_REGEX.findall(desc):
+        field = KEY_FIELDS.get(key.strip().lower())
+        if field is None:
+            continue
+        value = value.strip()
+        try:
+            converted = FIELD_CONVERTERS[field](value)
+        except ValueError:
+            continue
+        if converted is None and field == 'time':
+            continue
+        metadata[field] = converted
+
+    if 'encryption' in metadata:
+        metadata['capabilities'] = metadata['encryption']
+
+    return metadata
@@ -0,0 +1,168 @@
+"""
+Streaming KML Reader
+Incremental Placemark parser shared by the KML pipelines
+
+ET.parse() builds the whole document tree before the first Placemark can be
+read, which for a multi-GB WiGLE export needs several times the file size in
+memory. iter_placemarks() runs iterparse instead: each Placemark is yielded
+as soon as its end tag is read and is then cleared and detached from its
+parent, so memory stays bounded by one Placemark plus the open ancestors.
+
+open_kml() reads KMZ archives and gzip/xz/zstd compressed KML the same way:
+the format is sniffed from the magic bytes and the document is decompressed
+incrementally into the parser, never staged on disk.
+"""
+
+import gzip
+import lzma
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+from contextlib import contextmanager
+from typing import IO, Iterator, NamedTuple, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+KML_NS = "http://www.opengis.net/kml/2.2"
+
+# File names the KML pipelines pick up (compound suffixes first)
+KML_SUFFIXES = (".kml.gz", ".kml.xz", ".kml.zst", ".kml.zstd", ".kml", ".kmz")
+
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+def is_kml_file(path: str) -> bool:
+    """True if path names a plain, KMZ or compressed KML file"""
+    return path.lower().endswith(KML_SUFFIXES)
+
+
+def kml_stem(path: str) -> str:
+    """File name without its KML (and compression) suffix"""
+    name = os.path.basename(path)
+    for suffix in KML_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name.rsplit(".", 1)[0]
+
+
+def _kmz_member(archive: zipfile.ZipFile) -> str:
+    """The KMZ document: doc.kml, else the first .kml entry (root level first)"""
+    names = [info.filename for info in archive.infolist() if info.filename.lower().endswith(".kml")]
+    if not names:
+        raise ValueError(f"no .kml document in KMZ archive {archive.filename}")
+    if "doc.kml" in names:
+        return "doc.kml"
+    return min(names, key=lambda name: name.count("/"))
+
+
+@contextmanager
+def open_kml(path: str) -> Iterator[IO[bytes]]:
+    """
+    Open a KML, KMZ, .kml.gz, .kml.xz or .kml.zst file as a binary stream of
+    the KML document, decompressing on the fly
+    """
+    with open(path, "rb") as raw:
+        magic = raw.read(6)
+        raw.seek(0)
+
+        if magic.startswith(ZIP_MAGIC):
+            with zipfile.ZipFile(raw) as archive, archive.open(_kmz_member(archive)) as stream:
+                yield stream
+        elif magic.startswith(GZIP_MAGIC):
+            with gzip.GzipFile(fileobj=raw) as stream:
+                yield stream
+        elif magic.startswith(XZ_MAGIC):
+            with lzma.LZMAFile(raw) as stream:
+                yield stream
+        elif magic.startswith(ZSTD_MAGIC):
+            if zstandard is None:
+                raise RuntimeError(f"{path} is zstd-compressed; install the zstandard package to read it")
+            with zstandard.ZstdDecompressor().stream_reader(raw) as stream:
+                yield stream
+        else:
+            yield raw
+
+
+class Placemark(NamedTuple):
+    """
+    Text content of one Placemark
+    description and coordinates are None when the element is missing and
+    '' when it is empty; coordinates come from the first Point found
+    """
+    name: Optional[str]
+    description: Optional[str]
+    coordinates: Optional[str]
+
+
+def _local(tag: str) -> str:
+    """Tag name without its {namespace} prefix"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _placemark(elem: ET.Element) -> Placemark:
+    name = description = coordinates = None
+    for child in elem:
+        tag = _local(child.tag)
+        if tag == "name":
+            name = child.text
+        elif tag == "description":
+            description = child.text or ""
+    for node in elem.iter():
+        if _local(node.tag) == "Point":
+            for child in node:
+                if _local(child.tag) == "coordinates":
+                    coordinates = child.text or ""
+                    break
+            break
+    return Placemark(name, description, coordinates)
+
+
+def iter_placemarks(source: Union[str, IO[bytes]]) -> Iterator[Placemark]:
+    """
+    Yield the Placemarks of a KML document (path or binary file object)
+    one at a time, in document order. Works with and without the KML
+    namespace; paths may be KMZ or compressed (see open_kml).
+    """
+    if isinstance(source, str):
+        with open_kml(source) as stream:
+            yield from _iter_placemarks(stream)
+    else:
+        yield from _iter_placemarks(source)
+
+
+def _iter_placemarks(source: IO[bytes]) -> Iterator[Placemark]:
+    stack = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        if _local(elem.tag) != "Placemark":
+            continue
+
+        yield _placemark(elem)
+
+        # Drop the finished Placemark so the open Document/Folder elements
+        # never accumulate children
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+def parse_coordinates(text: str) -> Tuple[float, float, Optional[float]]:
+    """
+    Split a KML "lon,lat[,alt]" coordinate string
+    Returns (lon, lat, altitude or None); raises ValueError if malformed
+    """
+    parts = text.strip().split(",")
+    if len(parts) < 2:
+        raise ValueError(f"invalid KML coordinates: {text!r}")
+    altitude = float(parts[2]) if len(parts) > 2 and parts[2].strip() else None
+    return float(parts[0]), float(parts[1]), altitude
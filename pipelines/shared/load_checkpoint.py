@@ -0,0 +1,100 @@
+"""
+Load Checkpoint Journal
+Resumable file loads for the SQLite-backed pipelines (Kismet, WiGLE)
+
+Loaders read each source table in rowid ranges and record the last rowid of
+every range in app.ingest_checkpoints in the SAME transaction as the rows it
+wrote. A crash therefore leaves the journal pointing at exactly the last
+committed range, and a rerun of the same file resumes right after it.
+
+Checkpoints are keyed by (file_hash, table_name); the hash is a SHA-256 of
+the input file, so a renamed copy resumes while a modified file starts over.
+The table comes from schema/ingest_checkpoints.sql; a loader fails up front,
+naming that file, when it has not been applied.
+"""
+
+import hashlib
+from typing import Optional, Tuple
+
+# The journal table is created by schema/ingest_checkpoints.sql, not at runtime
+CHECKPOINT_TABLE = "app.ingest_checkpoints"
+CHECKPOINT_SCHEMA_FILE = "schema/ingest_checkpoints.sql"
+
+CHECKPOINT_ADVANCE_SQL = """
+    INSERT INTO app.ingest_checkpoints
+        (file_hash, table_name, filename, last_rowid, rows_loaded)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (file_hash, table_name) DO UPDATE SET
+        filename = EXCLUDED.filename,
+        last_rowid = EXCLUDED.last_rowid,
+        rows_loaded = app.ingest_checkpoints.rows_loaded + EXCLUDED.rows_loaded,
+        updated_at = NOW()
+"""
+
+CHECKPOINT_COMPLETE_SQL = """
+    INSERT INTO app.ingest_checkpoints
+        (file_hash, table_name, filename, completed)
+    VALUES (%s, %s, %s, TRUE)
+    ON CONFLICT (file_hash, table_name) DO UPDATE SET
+        completed = TRUE,
+        updated_at = NOW()
+"""
+
+
+def require_table(cur, table: str, schema_file: str) -> None:
+    """Raise RuntimeError naming the schema file to apply unless table exists"""
+    cur.execute("SELECT to_regclass(%s)", (table,))
+    if cur.fetchone()[0] is None:
+        raise RuntimeError(f"{table} does not exist; apply {schema_file} first")
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of a file, read in chunk_size blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LoadCheckpoint:
+    """
+    Checkpoint journal of one input file
+
+    All writes go through the caller's cursor and are committed (or rolled
+    back) together with the loaded rows; this class never commits.
+    """
+
+    def __init__(self, cur, file_hash: str, filename: Optional[str] = None):
+        self.cur = cur
+        self.file_hash = file_hash
+        self.filename = filename
+        require_table(cur, CHECKPOINT_TABLE, CHECKPOINT_SCHEMA_FILE)
+
+    def position(self, table: str) -> Tuple[int, bool]:
+        """
+        Where a previous load of this file stopped
+        Returns (last committed rowid, whether the table was completed)
+        """
+        self.cur.execute(
+            "SELECT last_rowid, completed FROM app.ingest_checkpoints "
+            "WHERE file_hash = %s AND table_name = %s",
+            (self.file_hash, table)
+        )
+        row = self.cur.fetchone()
+        if row is None:
+            return 0, False
+        return row[0], row[1]
+
+    def advance(self, table: str, last_rowid: int, rows: int) -> None:
+        """Record that every row up to last_rowid has been written"""
+        self.cur.execute(
+            CHECKPOINT_ADVANCE_SQL,
+            (self.file_hash, table, self.filename, last_rowid, rows)
+        )
+
+    def complete(self, table: str) -> None:
+        """Mark table as fully loaded so reruns skip it"""
+        self.cur.execute(
+            CHECKPOINT_COMPLETE_SQL, (self.file_hash, table, self.filename)
+        )
@@ -0,0 +1,113 @@
+"""
+PostgreSQL COPY Helpers
+Serialize Python rows to COPY text format and stream them with psycopg2
+
+Used by SafeIngester's bulk paths and by the pipeline loaders that
+replace per-row INSERTs with COPY FROM STDIN.
+"""
+
+import io
+import itertools
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, List, Sequence
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield successive lists of at most size items from any iterable"""
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def copy_value(value: Any) -> str:
+    """Format a single value for PostgreSQL COPY text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, bytes):
+        value = value.decode("utf-8", errors="replace")
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_buffer(rows: Iterable[Sequence[Any]]) -> io.StringIO:
+    """Serialize rows into an in-memory COPY text stream"""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(copy_value(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+class CopyStream(io.TextIOBase):
+    """
+    Read-only file object that renders rows as COPY text on demand
+
+    Passing it to copy_expert pipes rows from any iterable (e.g. an open
+    SQLite cursor) into COPY FROM STDIN without an intermediate file or an
+    in-memory copy of the whole table. rows counts the rows read so far.
+    """
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.rows = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = "\t".join(copy_value(v) for v in row) + "\n"
+            parts.append(line)
+            length += len(line)
+            self.rows += 1
+        data = "".join(parts)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def copy_rows(
+    cur,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    batch_size: int = 50000,
+    on_batch=None
+) -> int:
+    """
+    COPY rows into table in batches of batch_size, so an arbitrarily long
+    iterable never has more than one batch serialized in memory.
+    on_batch(rows_so_far) runs after each batch, e.g. to commit or report
+    progress.
+    Returns the number of rows copied
+    """
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    copied = 0
+    for batch in chunked(rows, max(1, batch_size)):
+        cur.copy_expert(sql, copy_buffer(batch))
+        copied += len(batch)
+        if on_batch is not None:
+            on_batch(copied)
+    return copied
@@ -7,54 +7,460 @@ re-importing the same data, while preserving cross-source duplicates
 for data enrichment.
 """
 
+import functools
+import threading
+import time
 import psycopg2
+import psycopg2.extensions
+from contextlib import contextmanager
 from psycopg2.extras import Json
-from typing import List, Dict, Any, Optional
+from psycopg2.pool import ThreadedConnectionPool
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Sequence, Tuple
 from datetime import datetime
 import logging
 
+try:
+    from .pg_copy import chunked, copy_buffer
+    from .seen_set import SeenSets
+except ImportError:
+    from pg_copy import chunked, copy_buffer
+    from seen_set import SeenSets
+
 logger = logging.getLogger(__name__)
 
+# Rows per app.batch_insert_kml_locations call; bounds the client-side
+# and server-side size of each JSONB parameter
+KML_CHUNK_SIZE = 5000
+
+# A pooled connection idle for longer than this is pinged before reuse
+IDLE_PING_SECONDS = 30.0
+
+# How long close() waits for borrowed connections to be given back
+CLOSE_TIMEOUT = 30.0
+
+
+# COPY bulk paths: each batch is streamed into a session temp table and merged
+# into the target in one INSERT ... SELECT using the same ON CONFLICT keys as
+# the app.safe_insert_* functions. The INSERT row count is the inserted count.
+
+LEGACY_COPY_COLUMNS = (
+    "bssid", "level", "lat", "lon", "altitude", "accuracy", "time", "source_id"
+)
+
+LEGACY_COPY_TEMP_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS safe_ingest_legacy_tmp (
+        bssid TEXT,
+        level INTEGER,
+        lat DOUBLE PRECISION,
+        lon DOUBLE PRECISION,
+        altitude DOUBLE PRECISION,
+        accuracy DOUBLE PRECISION,
+        time BIGINT,
+        source_id INTEGER
+    ) ON COMMIT DELETE ROWS
+"""
+
+LEGACY_COPY_MERGE = """
+    INSERT INTO app.locations_legacy (
+        bssid, level, lat, lon, altitude, accuracy, time, source_id
+    )
+    SELECT bssid, level, lat, lon, altitude, accuracy, time, source_id
+    FROM safe_ingest_legacy_tmp
+    ON CONFLICT (bssid, time, ROUND(lat::NUMERIC, 6), ROUND(lon::NUMERIC, 6), COALESCE(source_id, 0))
+    DO NOTHING
+"""
+
+WIGLE_API_COPY_COLUMNS = (
+    "bssid", "signal_level", "lat", "lon", "altitude", "accuracy", "time", "query_params"
+)
+
+WIGLE_API_COPY_TEMP_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS safe_ingest_wigle_api_tmp (
+        bssid TEXT,
+        signal_level INTEGER,
+        lat DOUBLE PRECISION,
+        lon DOUBLE PRECISION,
+        altitude DOUBLE PRECISION,
+        accuracy DOUBLE PRECISION,
+        time TIMESTAMPTZ,
+        query_params JSONB
+    ) ON COMMIT DELETE ROWS
+"""
+
+WIGLE_API_COPY_MERGE = """
+    INSERT INTO app.wigle_api_locations_staging (
+        bssid, signal_level, lat, lon, altitude, accuracy, time, query_params
+    )
+    SELECT bssid, signal_level, lat, lon, altitude, accuracy, time, query_params
+    FROM safe_ingest_wigle_api_tmp
+    ON CONFLICT (bssid, EXTRACT(EPOCH FROM time)::BIGINT, ROUND(lat::NUMERIC, 6), ROUND(lon::NUMERIC, 6))
+    DO NOTHING
+"""
+
+
+# Upper bounds (seconds) of the per-batch database latency histogram
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prometheus_labels(labels: Dict[str, str]) -> str:
+    """Render a Prometheus label set such as {source="kml"}"""
+    if not labels:
+        return ""
+    pairs = (f'{key}="{_escape_label(value)}"' for key, value in sorted(labels.items()))
+    return "{" + ",".join(pairs) + "}"
+
 
 class SafeIngestStats:
     """Statistics from a batch ingestion operation"""
 
-    def __init__(self, total: int = 0, inserted: int = 0, duplicates: int = 0):
+    def __init__(
+        self,
+        total: int = 0,
+        inserted: int = 0,
+        duplicates: int = 0,
+        known_duplicates: int = 0
+    ):
         self.total = total
         self.inserted = inserted
         self.duplicates = duplicates
+        # Dropped client-side by the seen-set before reaching the database
+        self.known_duplicates = known_duplicates
+
+        # Timing and volume: wall_time covers the whole call, db_time only the
+        # database round trips, so wall_time - db_time is client-side work
+        # (parsing, fingerprinting, serialization)
+        self.wall_time = 0.0
+        self.db_time = 0.0
+        self.bytes_sent = 0
+        self.batches = 0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+    def record_batch(self, latency: float, bytes_sent: int = 0) -> None:
+        """Record one database round trip (or COPY + merge) for a batch"""
+        self.batches += 1
+        self.db_time += latency
+        self.bytes_sent += bytes_sent
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.latency_buckets[i] += 1
+                break
+
+    @property
+    def client_time(self) -> float:
+        """Seconds spent outside database round trips"""
+        return max(0.0, self.wall_time - self.db_time)
+
+    @property
+    def rows_per_second(self) -> float:
+        """Observations processed per wall-clock second"""
+        return self.total / self.wall_time if self.wall_time > 0 else 0.0
 
     @property
     def duplicate_rate(self) -> float:
-        """Percentage of duplicates"""
-        return (self.duplicates / self.total * 100) if self.total > 0 else 0.0
+        """Percentage of duplicates, including known duplicates"""
+        all_duplicates = self.duplicates + self.known_duplicates
+        return (all_duplicates / self.total * 100) if self.total > 0 else 0.0
 
     def __str__(self) -> str:
         return (
-            f"Ingestion: {self.inserted} inserted, {self.duplicates} duplicates "
+            f"Ingestion: {self.inserted} inserted, {self.duplicates} duplicates, "
+            f"{self.known_duplicates} known duplicates skipped "
             f"({self.duplicate_rate:.1f}% duplicate rate) out of {self.total} total"
         )
 
+    def merge(self, other: "SafeIngestStats") -> "SafeIngestStats":
+        """Accumulate another batch's counts into this one"""
+        self.total += other.total
+        self.inserted += other.inserted
+        self.duplicates += other.duplicates
+        self.known_duplicates += other.known_duplicates
+        self.wall_time += other.wall_time
+        self.db_time += other.db_time
+        self.bytes_sent += other.bytes_sent
+        self.batches += other.batches
+        self.latency_buckets = [
+            a + b for a, b in zip(self.latency_buckets, other.latency_buckets)
+        ]
+        return self
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "total": self.total,
             "inserted": self.inserted,
             "duplicates": self.duplicates,
-            "duplicate_rate": round(self.duplicate_rate, 2)
+            "known_duplicates": self.known_duplicates,
+            "duplicate_rate": round(self.duplicate_rate, 2),
+            "wall_time": round(self.wall_time, 3),
+            "db_time": round(self.db_time, 3),
+            "client_time": round(self.client_time, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "bytes_sent": self.bytes_sent,
+            "batches": self.batches,
+            "batch_latency_histogram": {
+                str(bound): count
+                for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+            }
         }
 
+    def to_prometheus(
+        self,
+        prefix: str = "shadowcheck_ingest",
+        labels: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        Render the stats in Prometheus text exposition format, e.g. for a
+        node_exporter textfile collector or a Pushgateway
+        """
+        labels = dict(labels or {})
+        base = _prometheus_labels(labels)
+        lines = [
+            f"# HELP {prefix}_observations_total Observations processed by outcome",
+            f"# TYPE {prefix}_observations_total counter",
+        ]
+        for outcome, value in (
+            ("inserted", self.inserted),
+            ("duplicate", self.duplicates),
+            ("known_duplicate", self.known_duplicates),
+        ):
+            outcome_labels = _prometheus_labels({**labels, "outcome": outcome})
+            lines.append(f"{prefix}_observations_total{outcome_labels} {value}")
+
+        for name, kind, help_text, value in (
+            ("bytes_sent_total", "counter", "Bytes of query and COPY payload sent", self.bytes_sent),
+            ("wall_seconds", "gauge", "Wall-clock duration of the ingestion", self.wall_time),
+            ("db_seconds", "gauge", "Time spent in database round trips", self.db_time),
+            ("client_seconds", "gauge", "Time spent outside database round trips", self.client_time),
+            ("rows_per_second", "gauge", "Ingestion throughput", self.rows_per_second),
+        ):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name}{base} {value}")
+
+        lines.append(f"# HELP {prefix}_batch_seconds Per-batch database latency")
+        lines.append(f"# TYPE {prefix}_batch_seconds histogram")
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets):
+            cumulative += count
+            bucket_labels = _prometheus_labels({**labels, "le": str(bound)})
+            lines.append(f"{prefix}_batch_seconds_bucket{bucket_labels} {cumulative}")
+        inf_labels = _prometheus_labels({**labels, "le": "+Inf"})
+        lines.append(f"{prefix}_batch_seconds_bucket{inf_labels} {self.batches}")
+        lines.append(f"{prefix}_batch_seconds_sum{base} {self.db_time}")
+        lines.append(f"{prefix}_batch_seconds_count{base} {self.batches}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _timed(method: Callable[..., SafeIngestStats]) -> Callable[..., SafeIngestStats]:
+    """Set wall_time on the stats returned by a batch method"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs) -> SafeIngestStats:
+        started = time.perf_counter()
+        stats = method(*args, **kwargs)
+        stats.wall_time = time.perf_counter() - started
+        return stats
+    return wrapper
+
+
+def _query_size(cur) -> int:
+    """Size of the last statement psycopg2 sent on this cursor"""
+    return len(cur.query) if cur.query else 0
+
 
 class SafeIngester:
     """
     Handles safe ingestion with deduplication for all pipelines
+
+    With seen_set_dir set, observations whose fingerprints are already in the
+    per-source seen-set are dropped before reaching the database and counted
+    as known_duplicates.
     """
 
-    def __init__(self, connection_string: str):
+    def __init__(
+        self,
+        connection_string: str,
+        pool_size: int = 4,
+        min_connections: int = 1,
+        health_check: bool = True,
+        seen_set_dir: Optional[str] = None,
+        idle_ping_seconds: float = IDLE_PING_SECONDS
+    ):
         self.connection_string = connection_string
+        self.pool_size = max(1, pool_size)
+        self.min_connections = min(max(0, min_connections), self.pool_size)
+        self.health_check = health_check
+        self.idle_ping_seconds = idle_ping_seconds
+        # id(conn) -> time.monotonic() it was given back; 0.0 after an error,
+        # so the next borrower pings it
+        self._last_used: Dict[int, float] = {}
+
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        # ThreadedConnectionPool raises instead of blocking when exhausted,
+        # so worker threads wait on this semaphore for a free slot
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+
+        # Optional persistent fingerprints of already ingested observations
+        self.seen_sets = SeenSets(seen_set_dir) if seen_set_dir else None
+
+    def __enter__(self) -> "SafeIngester":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self, timeout: Optional[float] = CLOSE_TIMEOUT) -> None:
+        """
+        Close every pooled connection and compact the seen-sets
+        Waits up to timeout seconds (None: indefinitely) for borrowed
+        connections to be given back. Any still borrowed after that are
+        closed under their borrowers, whose next statement fails with
+        InterfaceError.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        taken = 0
+        try:
+            # Every free slot is a connection not in use
+            while taken < self.pool_size:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not self._slots.acquire(timeout=remaining):
+                    logger.warning("Closing pool with %d connection(s) still borrowed", self.pool_size - taken)
+                    break
+                taken += 1
+            with self._pool_lock:
+                if self._pool is not None and not self._pool.closed:
+                    self._pool.closeall()
+                self._pool = None
+                self._last_used.clear()
+        finally:
+            for _ in range(taken):
+                self._slots.release()
+        if self.seen_sets is not None:
+            self.seen_sets.close()
+
+    def _partition(self, source: str, observations: Iterable[Dict[str, Any]]):
+        """
+        Drop observations the seen-set already knows
+        Returns (fresh observations, their fingerprints, known duplicate count)
+        """
+        if self.seen_sets is None:
+            return list(observations), [], 0
+        return self.seen_sets.partition(source, observations)
+
+    def _finish(
+        self,
+        source: str,
+        stats: SafeIngestStats,
+        fingerprints: List[int],
+        known: int
+    ) -> SafeIngestStats:
+        """Record committed fingerprints and fold known duplicates into stats"""
+        if self.seen_sets is not None and fingerprints:
+            self.seen_sets.commit(source, fingerprints)
+        return stats.merge(SafeIngestStats(total=known, known_duplicates=known))
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """Create the connection pool on first use"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(
+                    self.min_connections,
+                    self.pool_size,
+                    self.connection_string
+                )
+            return self._pool
 
-    def _get_connection(self):
-        """Get a new database connection"""
-        return psycopg2.connect(self.connection_string)
+    def _is_healthy(self, conn) -> bool:
+        """
+        Check that a pooled connection is still usable
+        Only conn.closed and the transaction status are checked locally; a
+        SELECT 1 round trip is added (with health_check) for connections
+        that are new to this ingester, saw an error, or sat idle for longer
+        than idle_ping_seconds
+        """
+        if conn.closed:
+            return False
+        status = conn.info.transaction_status
+        if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        if not self.health_check:
+            return True
+        last_used = self._last_used.get(id(conn))
+        if last_used and time.monotonic() - last_used < self.idle_ping_seconds:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @contextmanager
+    def _connection(self) -> Iterator[Any]:
+        """
+        Borrow a connection from the pool
+        Broken connections are discarded instead of being returned
+        """
+        acquired = False
+        pool = None
+        conn = None
+        discard = False
+        failed = False
+        try:
+            self._slots.acquire()
+            acquired = True
+            pool = self._get_pool()
+            conn = pool.getconn()
+            if not self._is_healthy(conn):
+                logger.warning("Discarding unhealthy pooled connection")
+                self._last_used.pop(id(conn), None)
+                pool.putconn(conn, close=True)
+                conn = None
+                conn = pool.getconn()
+
+            yield conn
+
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        except Exception:
+            failed = True
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            try:
+                if conn is not None:
+                    self._release(pool, conn, discard, failed)
+            finally:
+                if acquired:
+                    self._slots.release()
+
+    def _release(self, pool: ThreadedConnectionPool, conn, discard: bool, failed: bool = False) -> None:
+        """Give a borrowed connection back, or close it if its pool was closed meanwhile"""
+        discard = discard or bool(conn.closed)
+        with self._pool_lock:
+            if not pool.closed:
+                if discard:
+                    self._last_used.pop(id(conn), None)
+                else:
+                    self._last_used[id(conn)] = 0.0 if failed else time.monotonic()
+                pool.putconn(conn, close=discard)
+                return
+        if not conn.closed:
+            conn.close()
 
     def insert_kml_observation(
         self,
@@ -75,7 +481,14 @@ class SafeIngester:
         Insert single KML observation
         Returns True if inserted, False if duplicate
         """
-        with self._get_connection() as conn:
+        _, fingerprints, known = self._partition("kml", [{
+            "bssid": bssid, "time": time_ms, "lat": lat, "lon": lon,
+            "level": level, "kml_filename": kml_filename
+        }])
+        if known:
+            return False
+
+        with self._connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -91,34 +504,66 @@ class SafeIngester:
                 )
                 result = cur.fetchone()[0]
                 conn.commit()
-                return result > 0
 
+        self._finish("kml", SafeIngestStats(), fingerprints, 0)
+        return result > 0
+
+    @_timed
     def batch_insert_kml_observations(
         self,
-        observations: List[Dict[str, Any]]
+        observations: Iterable[Dict[str, Any]],
+        chunk_size: int = KML_CHUNK_SIZE,
+        commit_per_chunk: bool = True
     ) -> SafeIngestStats:
         """
         Batch insert KML observations with deduplication
+        Accepts any iterable (including generators) and sends it in chunks of
+        chunk_size rows, so only one chunk is held in memory at a time.
+        With commit_per_chunk=False all chunks share a single transaction.
         Returns statistics about inserted vs duplicate rows
         """
-        if not observations:
-            return SafeIngestStats()
+        stats = SafeIngestStats()
 
-        with self._get_connection() as conn:
+        with self._connection() as conn:
             with conn.cursor() as cur:
-                # Use the PostgreSQL batch insert function
-                cur.execute(
-                    "SELECT app.batch_insert_kml_locations(%s::jsonb)",
-                    (Json(observations),)
-                )
-                result = cur.fetchone()[0]
+                uncommitted: List[int] = []
+                for chunk in chunked(observations, max(1, chunk_size)):
+                    chunk, fingerprints, known = self._partition("kml", chunk)
+                    chunk_stats = SafeIngestStats()
+                    started = time.perf_counter()
+                    if chunk:
+                        # Use the PostgreSQL batch insert function
+                        cur.execute(
+                            "SELECT app.batch_insert_kml_locations(%s::jsonb)",
+                            (Json(chunk),)
+                        )
+                        result = cur.fetchone()[0]
+                        chunk_stats = SafeIngestStats(
+                            total=result["total"],
+                            inserted=result["inserted"],
+                            duplicates=result["duplicates"]
+                        )
+
+                    if commit_per_chunk:
+                        conn.commit()
+                    if chunk:
+                        chunk_stats.record_batch(
+                            time.perf_counter() - started, _query_size(cur)
+                        )
+
+                    if commit_per_chunk:
+                        # Committed: the fingerprints can be made persistent
+                        stats.merge(self._finish("kml", chunk_stats, fingerprints, known))
+                    else:
+                        # Only persisted once the shared transaction commits
+                        uncommitted.extend(fingerprints)
+                        stats.merge(chunk_stats.merge(
+                            SafeIngestStats(total=known, known_duplicates=known)
+                        ))
+
                 conn.commit()
 
-                return SafeIngestStats(
-                    total=result["total"],
-                    inserted=result["inserted"],
-                    duplicates=result["duplicates"]
-                )
+        return self._finish("kml", stats, uncommitted, 0)
 
     def insert_wigle_api_observation(
         self,
@@ -135,7 +580,14 @@ class SafeIngester:
         Insert single WiGLE API observation
         Returns True if inserted, False if duplicate
         """
-        with self._get_connection() as conn:
+        _, fingerprints, known = self._partition("wigle_api", [{
+            "bssid": bssid, "time": time, "lat": lat, "lon": lon,
+            "signal_level": signal_level
+        }])
+        if known:
+            return False
+
+        with self._connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -151,22 +603,56 @@ class SafeIngester:
                 )
                 result = cur.fetchone()[0]
                 conn.commit()
-                return result > 0
 
+        self._finish("wigle_api", SafeIngestStats(), fingerprints, 0)
+        return result > 0
+
+    @_timed
     def batch_insert_wigle_api_observations(
         self,
-        observations: List[Dict[str, Any]]
+        observations: List[Dict[str, Any]],
+        use_copy: bool = False
     ) -> SafeIngestStats:
         """
         Batch insert WiGLE API observations
+        With use_copy=True the batch is COPY-streamed and merged in one statement
         Returns statistics
         """
         if not observations:
             return SafeIngestStats()
 
+        observations, fingerprints, known = self._partition("wigle_api", observations)
+        if not observations:
+            return self._finish("wigle_api", SafeIngestStats(), fingerprints, known)
+
+        if use_copy:
+            rows = [
+                (
+                    obs["bssid"],
+                    obs["signal_level"],
+                    obs["lat"],
+                    obs["lon"],
+                    obs.get("altitude"),
+                    obs.get("accuracy"),
+                    obs["time"],
+                    obs.get("query_params") or None
+                )
+                for obs in observations
+            ]
+            stats = self._copy_merge(
+                rows,
+                WIGLE_API_COPY_TEMP_TABLE,
+                "safe_ingest_wigle_api_tmp",
+                WIGLE_API_COPY_COLUMNS,
+                WIGLE_API_COPY_MERGE
+            )
+            return self._finish("wigle_api", stats, fingerprints, known)
+
         stats = SafeIngestStats(total=len(observations))
+        started = time.perf_counter()
+        sent = 0
 
-        with self._get_connection() as conn:
+        with self._connection() as conn:
             with conn.cursor() as cur:
                 for obs in observations:
                     cur.execute(
@@ -187,6 +673,7 @@ class SafeIngester:
                         )
                     )
                     result = cur.fetchone()[0]
+                    sent += _query_size(cur)
                     if result > 0:
                         stats.inserted += 1
                     else:
@@ -194,7 +681,9 @@ class SafeIngester:
 
                 conn.commit()
 
-        return stats
+        stats.record_batch(time.perf_counter() - started, sent)
+
+        return self._finish("wigle_api", stats, fingerprints, known)
 
     def insert_legacy_observation(
         self,
@@ -211,7 +700,14 @@ class SafeIngester:
         Insert single legacy (SQLite) observation
         Returns True if inserted, False if duplicate
         """
-        with self._get_connection() as conn:
+        _, fingerprints, known = self._partition("legacy", [{
+            "bssid": bssid, "time": time_ms, "lat": lat, "lon": lon,
+            "level": level, "source_id": source_id
+        }])
+        if known:
+            return False
+
+        with self._connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -226,22 +722,56 @@ class SafeIngester:
                 )
                 result = cur.fetchone()[0]
                 conn.commit()
-                return result > 0
 
+        self._finish("legacy", SafeIngestStats(), fingerprints, 0)
+        return result > 0
+
+    @_timed
     def batch_insert_legacy_observations(
         self,
-        observations: List[Dict[str, Any]]
+        observations: List[Dict[str, Any]],
+        use_copy: bool = False
     ) -> SafeIngestStats:
         """
         Batch insert legacy observations
+        With use_copy=True the batch is COPY-streamed and merged in one statement
         Returns statistics
         """
         if not observations:
             return SafeIngestStats()
 
+        observations, fingerprints, known = self._partition("legacy", observations)
+        if not observations:
+            return self._finish("legacy", SafeIngestStats(), fingerprints, known)
+
+        if use_copy:
+            rows = [
+                (
+                    obs["bssid"],
+                    obs["level"],
+                    obs["lat"],
+                    obs["lon"],
+                    obs.get("altitude"),
+                    obs.get("accuracy"),
+                    obs["time"],
+                    obs.get("source_id")
+                )
+                for obs in observations
+            ]
+            stats = self._copy_merge(
+                rows,
+                LEGACY_COPY_TEMP_TABLE,
+                "safe_ingest_legacy_tmp",
+                LEGACY_COPY_COLUMNS,
+                LEGACY_COPY_MERGE
+            )
+            return self._finish("legacy", stats, fingerprints, known)
+
         stats = SafeIngestStats(total=len(observations))
+        started = time.perf_counter()
+        sent = 0
 
-        with self._get_connection() as conn:
+        with self._connection() as conn:
             with conn.cursor() as cur:
                 for obs in observations:
                     cur.execute(
@@ -262,6 +792,7 @@ class SafeIngester:
                         )
                     )
                     result = cur.fetchone()[0]
+                    sent += _query_size(cur)
                     if result > 0:
                         stats.inserted += 1
                     else:
@@ -269,6 +800,45 @@ class SafeIngester:
 
                 conn.commit()
 
+        stats.record_batch(time.perf_counter() - started, sent)
+
+        return self._finish("legacy", stats, fingerprints, known)
+
+
+    def _copy_merge(
+        self,
+        rows: List[Sequence[Any]],
+        temp_table_sql: str,
+        temp_table: str,
+        columns: Sequence[str],
+        merge_sql: str
+    ) -> SafeIngestStats:
+        """
+        COPY rows into a session temp table, then merge them into the target
+        with a single ON CONFLICT DO NOTHING insert
+        Returns statistics
+        """
+        stats = SafeIngestStats(total=len(rows))
+        buf = copy_buffer(rows)
+        started = time.perf_counter()
+
+        with self._connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(temp_table_sql)
+                cur.copy_expert(
+                    f"COPY {temp_table} ({', '.join(columns)}) FROM STDIN",
+                    buf
+                )
+                cur.execute(merge_sql)
+                stats.inserted = cur.rowcount
+                stats.duplicates = stats.total - stats.inserted
+
+                conn.commit()
+
+        stats.record_batch(
+            time.perf_counter() - started,
+            len(buf.getvalue()) + len(temp_table_sql) + len(merge_sql)
+        )
         return stats
 
 
@@ -279,8 +849,8 @@ if __name__ == "__main__":
 
     load_dotenv()
 
-    # Initialize ingester
-    ingester = SafeIngester(os.getenv("DATABASE_URL"))
+    # Initialize ingester (pooled connections are released by close())
+    ingester = SafeIngester(os.getenv("DATABASE_URL"), pool_size=4)
 
     # Example: Batch insert KML observations
     kml_observations = [
@@ -329,4 +899,5 @@ if __name__ == "__main__":
 
     stats = ingester.batch_insert_kml_observations(kml_observations)
     print(stats)
+    ingester.close()
     # Expected: Ingestion: 2 inserted, 1 duplicates (33.3% duplicate rate) out of 3 total
@@ -0,0 +1,224 @@
+"""
+Persistent Observation Seen-Sets
+Client-side duplicate filtering for the SafeIngester pipelines
+
+Each source keeps a set of 64-bit observation fingerprints on disk so
+re-imported observations can be dropped before they cost a database round
+trip. Fingerprints hash the raw field values, which are at least as precise
+as the database dedupe keys (those round lat/lon to 6 places), so a
+fingerprint match is always a database duplicate too. Rows the seen-set
+does not know about still go through the app.safe_insert_* functions.
+
+On-disk layout per source, inside the seen-set directory:
+    <source>.fp       sorted little-endian uint64 fingerprints
+    <source>.fp.log   unsorted fingerprints appended since the last compaction
+"""
+
+import hashlib
+import heapq
+import logging
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def observation_fingerprint(
+    bssid: Optional[str],
+    time: Any,
+    lat: Optional[float],
+    lon: Optional[float],
+    level: Optional[int],
+    source: Any = None
+) -> int:
+    """
+    Stable 64-bit fingerprint of an observation
+    source distinguishes otherwise identical rows that the database keeps
+    apart (KML filename, legacy source_id)
+    """
+    key = "\x1f".join(
+        "" if value is None else repr(value)
+        for value in (bssid, time, lat, lon, level, source)
+    )
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return struct.unpack("<Q", digest)[0]
+
+
+def kml_fingerprint(obs: Dict[str, Any]) -> int:
+    return observation_fingerprint(
+        obs.get("bssid"), obs.get("time"), obs.get("lat"), obs.get("lon"),
+        obs.get("level"), obs.get("kml_filename")
+    )
+
+
+def wigle_api_fingerprint(obs: Dict[str, Any]) -> int:
+    time = obs.get("time")
+    if hasattr(time, "timestamp"):
+        time = time.timestamp()
+    return observation_fingerprint(
+        obs.get("bssid"), time, obs.get("lat"), obs.get("lon"),
+        obs.get("signal_level")
+    )
+
+
+def legacy_fingerprint(obs: Dict[str, Any]) -> int:
+    return observation_fingerprint(
+        obs.get("bssid"), obs.get("time"), obs.get("lat"), obs.get("lon"),
+        obs.get("level"), obs.get("source_id")
+    )
+
+
+FINGERPRINTERS: Dict[str, Callable[[Dict[str, Any]], int]] = {
+    "kml": kml_fingerprint,
+    "wigle_api": wigle_api_fingerprint,
+    "legacy": legacy_fingerprint,
+}
+
+
+def _read_fingerprints(path: str) -> array:
+    values = array("Q")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            values.frombytes(f.read())
+        if sys.byteorder != "little":
+            values.byteswap()
+    return values
+
+
+def _to_bytes(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array("Q", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unique(values: Iterable[int]) -> Iterable[int]:
+    """Drop adjacent repeats from a sorted stream"""
+    previous = None
+    for value in values:
+        if value != previous:
+            yield value
+            previous = value
+
+
+class SeenSet:
+    """
+    Fingerprints already ingested for one source
+    Lookups bisect the sorted base file held as a compact uint64 array;
+    newly added fingerprints live in a set until compact() folds them in
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.log_path = path + ".log"
+        self._lock = threading.Lock()
+        self._base = _read_fingerprints(path)
+        self._recent: Set[int] = set(_read_fingerprints(self.log_path))
+        self._pending: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._recent)
+
+    def __contains__(self, fingerprint: int) -> bool:
+        if fingerprint in self._recent:
+            return True
+        index = bisect_left(self._base, fingerprint)
+        return index < len(self._base) and self._base[index] == fingerprint
+
+    def update(self, fingerprints: Iterable[int]) -> None:
+        """Record fingerprints of committed observations"""
+        with self._lock:
+            for fingerprint in fingerprints:
+                if fingerprint not in self:
+                    self._recent.add(fingerprint)
+                    self._pending.append(fingerprint)
+
+    def flush(self) -> None:
+        """Append fingerprints added since the last flush to the log file"""
+        with self._lock:
+            if not self._pending:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.log_path, "ab") as f:
+                f.write(_to_bytes(array("Q", self._pending)))
+            self._pending = []
+
+    def compact(self) -> None:
+        """Merge the log into the sorted base file and remove the log"""
+        self.flush()
+        with self._lock:
+            if not self._recent:
+                return
+            merged = array("Q", _unique(heapq.merge(self._base, sorted(self._recent))))
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_to_bytes(merged))
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.log_path):
+                os.unlink(self.log_path)
+            self._base = merged
+            self._recent = set()
+            logger.info("Compacted %s: %d fingerprints", self.path, len(merged))
+
+
+class SeenSets:
+    """Per-source SeenSet files under one directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._sets: Dict[str, SeenSet] = {}
+
+    def get(self, source: str) -> SeenSet:
+        with self._lock:
+            if source not in self._sets:
+                self._sets[source] = SeenSet(
+                    os.path.join(self.directory, f"{source}.fp")
+                )
+            return self._sets[source]
+
+    def partition(
+        self,
+        source: str,
+        observations: Iterable[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[int], int]:
+        """
+        Split observations into ones the database has not seen yet
+        Returns (fresh observations, their fingerprints, known duplicate count);
+        repeats within the same batch also count as known duplicates
+        """
+        seen = self.get(source)
+        fingerprint = FINGERPRINTERS[source]
+        fresh: List[Dict[str, Any]] = []
+        fingerprints: List[int] = []
+        batch: Set[int] = set()
+        known = 0
+
+        for obs in observations:
+            fp = fingerprint(obs)
+            if fp in batch or fp in seen:
+                known += 1
+                continue
+            batch.add(fp)
+            fresh.append(obs)
+            fingerprints.append(fp)
+
+        return fresh, fingerprints, known
+
+    def commit(self, source: str, fingerprints: Iterable[int]) -> None:
+        """Remember fingerprints once their rows are committed"""
+        seen = self.get(source)
+        seen.update(fingerprints)
+        seen.flush()
+
+    def close(self) -> None:
+        """Compact every loaded seen-set"""
+        with self._lock:
+            sets = list(self._sets.values())
+        for seen in sets:
+            seen.compact()
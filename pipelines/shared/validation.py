@@ -0,0 +1,302 @@
+"""
+Observation Validation
+Vectorized coordinate and signal sanity checks shared by all parsers
+
+Records are validated in columnar batches: the lat/lon/altitude/accuracy/
+level/time fields of a batch are pulled into NumPy arrays and every check is
+one array expression, so the cost per record is a few vectorized passes
+instead of Python branching.
+
+Each record gets a bitmask of VALIDATION_FLAGS. What happens next is a
+policy of ObservationValidator:
+    position flags    (null island, coordinates out of range or missing,
+                       impossible speed) drop the record, or clear its
+                       position when bad_position="null"
+    field flags       (altitude, level, time out of range) clear that field
+    ACCURACY_OUTLIER  is only counted; the record is kept as is
+
+Every check only sees its own batch. In particular a speed spike needs a fix
+on both sides of it (in time order), so the earliest and latest fix of each
+batch are never flagged; stream() batches are VALIDATION_BATCH_SIZE records,
+so at most two fixes per batch go unchecked for speed.
+"""
+
+import math
+import time as _time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+NULL_ISLAND = 0x01
+BAD_COORDINATES = 0x02
+IMPOSSIBLE_SPEED = 0x04
+BAD_ALTITUDE = 0x08
+BAD_LEVEL = 0x10
+BAD_TIME = 0x20
+ACCURACY_OUTLIER = 0x40
+
+VALIDATION_FLAGS = {
+    "null_island": NULL_ISLAND,
+    "bad_coordinates": BAD_COORDINATES,
+    "impossible_speed": IMPOSSIBLE_SPEED,
+    "bad_altitude": BAD_ALTITUDE,
+    "bad_level": BAD_LEVEL,
+    "bad_time": BAD_TIME,
+    "accuracy_outlier": ACCURACY_OUTLIER,
+}
+
+POSITION_FLAGS = NULL_ISLAND | BAD_COORDINATES | IMPOSSIBLE_SPEED
+
+# Plausible ranges
+ALTITUDE_RANGE_M = (-1000.0, 20000.0)
+LEVEL_RANGE_DBM = (-150.0, 0.0)
+MIN_TIME_S = 946684800.0          # 2000-01-01
+MAX_CLOCK_SKEW_S = 86400.0        # tolerated time ahead of the local clock
+
+# Fastest credible movement between consecutive fixes (~1080 km/h)
+MAX_SPEED_MPS = 300.0
+
+# Accuracy beyond this many robust standard deviations above the batch
+# median, or beyond MAX_ACCURACY_M, is an outlier
+ACCURACY_OUTLIER_SIGMAS = 8.0
+MAX_ACCURACY_M = 5000.0
+
+EARTH_RADIUS_M = 6371008.8
+
+# Records per vectorized batch when validating a stream
+VALIDATION_BATCH_SIZE = 10000
+
+
+def haversine_m(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distance in meters between coordinate arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _speed_spikes(lat: np.ndarray, lon: np.ndarray, seconds: np.ndarray, max_speed: float) -> np.ndarray:
+    """
+    Fixes that would need an impossible speed both to get there from the
+    previous fix and to get from there to the next one (in time order)
+    The first and last fix have only one neighbour and are never flagged.
+    """
+    spikes = np.zeros(len(lat), dtype=bool)
+    usable = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon) | np.isnan(seconds)))
+    if len(usable) < 3:
+        return spikes
+
+    order = usable[np.argsort(seconds[usable], kind="stable")]
+    distance = haversine_m(lat[order[:-1]], lon[order[:-1]], lat[order[1:]], lon[order[1:]])
+    # Fixes in the same second share a position; never divide by less than 1 s
+    elapsed = np.maximum(np.diff(seconds[order]), 1.0)
+    too_fast = distance / elapsed > max_speed
+
+    spikes[order[1:-1]] = too_fast[:-1] & too_fast[1:]
+    return spikes
+
+
+def validate_columns(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    altitude: Optional[np.ndarray] = None,
+    accuracy: Optional[np.ndarray] = None,
+    level: Optional[np.ndarray] = None,
+    seconds: Optional[np.ndarray] = None,
+    max_speed: float = MAX_SPEED_MPS,
+    now: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Validate one columnar batch; missing values are NaN and time is in
+    seconds since the epoch.
+    Returns a uint8 array of VALIDATION_FLAGS per row
+    """
+    flags = np.zeros(len(lat), dtype=np.uint8)
+    with np.errstate(invalid="ignore"):
+        bad = (np.isnan(lat) | np.isnan(lon)
+               | (np.abs(lat) > 90.0) | (np.abs(lon) > 180.0))
+        flags[bad] |= BAD_COORDINATES
+        flags[(lat == 0.0) & (lon == 0.0)] |= NULL_ISLAND
+
+        if altitude is not None:
+            flags[(altitude < ALTITUDE_RANGE_M[0]) | (altitude > ALTITUDE_RANGE_M[1])] |= BAD_ALTITUDE
+
+        if level is not None:
+            flags[(level < LEVEL_RANGE_DBM[0]) | (level > LEVEL_RANGE_DBM[1])] |= BAD_LEVEL
+
+        if seconds is not None:
+            latest = (_time.time() if now is None else now) + MAX_CLOCK_SKEW_S
+            bad_time = (seconds < MIN_TIME_S) | (seconds > latest)
+            flags[bad_time] |= BAD_TIME
+            positioned = (flags & (BAD_COORDINATES | NULL_ISLAND)) == 0
+            usable_time = np.where(bad_time, np.nan, seconds)
+            spikes = _speed_spikes(
+                np.where(positioned, lat, np.nan), np.where(positioned, lon, np.nan),
+                usable_time, max_speed
+            )
+            flags[spikes] |= IMPOSSIBLE_SPEED
+
+        if accuracy is not None:
+            known = accuracy[~np.isnan(accuracy)]
+            outlier = (accuracy < 0) | (accuracy > MAX_ACCURACY_M)
+            if len(known):
+                median = np.median(known)
+                # 1.4826 * MAD estimates the standard deviation robustly
+                spread = 1.4826 * np.median(np.abs(known - median))
+                if spread > 0:
+                    outlier |= accuracy > median + ACCURACY_OUTLIER_SIGMAS * spread
+            flags[outlier] |= ACCURACY_OUTLIER
+
+    return flags
+
+
+def _column(records: Sequence[Dict[str, Any]], key: str) -> np.ndarray:
+    """Float column of key across records, None (or non-numeric) as NaN"""
+    def value(record):
+        v = record.get(key)
+        try:
+            return math.nan if v is None else float(v)
+        except (TypeError, ValueError):
+            return math.nan
+    return np.fromiter((value(r) for r in records), dtype=np.float64, count=len(records))
+
+
+class ObservationValidator:
+    """
+    Validate and clean records (dicts) of one parser
+
+    Field names map the record keys onto the checked columns; unset fields
+    are not checked. time_scale converts the time field to seconds (0.001
+    for epoch milliseconds). extra_time adds a sub-second field such as
+    Kismet's ts_usec, scaled by extra_time_scale. clear_time=False keeps
+    out-of-range times (e.g. when time is part of the record's identity).
+    Counts of every flag are kept in counts for reporting.
+    """
+
+    def __init__(
+        self,
+        lat: str = "lat",
+        lon: str = "lon",
+        altitude: Optional[str] = None,
+        accuracy: Optional[str] = None,
+        level: Optional[str] = None,
+        time: Optional[str] = None,
+        time_scale: float = 0.001,
+        extra_time: Optional[str] = None,
+        extra_time_scale: float = 1e-6,
+        bad_position: str = "drop",
+        max_speed: float = MAX_SPEED_MPS,
+        clear_time: bool = True,
+    ):
+        if bad_position not in ("drop", "null"):
+            raise ValueError("bad_position must be 'drop' or 'null'")
+        self.lat = lat
+        self.lon = lon
+        self.altitude = altitude
+        self.accuracy = accuracy
+        self.level = level
+        self.time = time
+        self.time_scale = time_scale
+        self.extra_time = extra_time
+        self.extra_time_scale = extra_time_scale
+        self.bad_position = bad_position
+        self.max_speed = max_speed
+        self.clear_time = clear_time
+        self.checked = 0
+        self.dropped = 0
+        self.counts = {name: 0 for name in VALIDATION_FLAGS}
+
+    def flags(self, records: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """VALIDATION_FLAGS of each record in one batch"""
+        seconds = None
+        if self.time:
+            seconds = _column(records, self.time) * self.time_scale
+            if self.extra_time:
+                seconds = seconds + np.nan_to_num(_column(records, self.extra_time)) * self.extra_time_scale
+        return validate_columns(
+            _column(records, self.lat),
+            _column(records, self.lon),
+            altitude=_column(records, self.altitude) if self.altitude else None,
+            accuracy=_column(records, self.accuracy) if self.accuracy else None,
+            level=_column(records, self.level) if self.level else None,
+            seconds=seconds,
+            max_speed=self.max_speed,
+        )
+
+    def apply(self, records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Validate one batch and apply the policy
+        Returns the records to load; cleaned fields are set to None in place
+        """
+        records = list(records)
+        if not records:
+            return records
+        flags = self.flags(records)
+
+        self.checked += len(records)
+        for name, bit in VALIDATION_FLAGS.items():
+            self.counts[name] += int(np.count_nonzero(flags & bit))
+
+        for index in np.flatnonzero(flags):
+            record = records[index]
+            flag = flags[index]
+            if flag & POSITION_FLAGS and self.bad_position == "null":
+                record[self.lat] = None
+                record[self.lon] = None
+                if self.altitude:
+                    record[self.altitude] = None
+            if flag & BAD_ALTITUDE:
+                record[self.altitude] = None
+            if flag & BAD_LEVEL:
+                record[self.level] = None
+            if flag & BAD_TIME and self.clear_time:
+                record[self.time] = None
+
+        bad_position = (flags & POSITION_FLAGS) != 0
+        self.dropped += int(np.count_nonzero(bad_position))
+        if self.bad_position == "drop":
+            return [record for record, bad in zip(records, bad_position) if not bad]
+        return records
+
+    def stream(self, records: Iterable[Dict[str, Any]], batch_size: int = VALIDATION_BATCH_SIZE) -> "ValidatedRecords":
+        """
+        Lazily validate an iterable (list or parser stream) in batches of
+        batch_size; batches are checked independently (see module notes)
+        """
+        return ValidatedRecords(records, self, batch_size)
+
+    def summary(self) -> str:
+        """One-line report of the flags raised so far"""
+        raised = ", ".join(f"{name}={count}" for name, count in self.counts.items() if count)
+        action = "dropped" if self.bad_position == "drop" else "positions cleared"
+        return f"validated {self.checked}, {action} {self.dropped}" + (f" ({raised})" if raised else "")
+
+
+class ValidatedRecords:
+    """
+    Iterable view of records validated batch by batch
+    len() is the length of the underlying records (before any drops), so
+    progress reporting over parser streams keeps working.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]], validator: ObservationValidator,
+                 batch_size: int = VALIDATION_BATCH_SIZE):
+        self.records = records
+        self.validator = validator
+        self.batch_size = batch_size
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __bool__(self) -> bool:
+        return bool(self.records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        batch = []
+        for record in self.records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield from self.validator.apply(batch)
+                batch = []
+        if batch:
+            yield from self.validator.apply(batch)
@@ -1,6 +1,8 @@
 #!/usr/bin/env bash
 # export_sqlite_all_tables_to_csv.sh
 # Exports 'location', 'network', 'route' tables from the given sqlite file to CSVs.
+# Superseded by sqlite_stage_import.py, which streams the SQLite tables straight
+# into the same staging tables with COPY (no intermediate CSV files).
 # Usage:
 #   ./export_sqlite_all_tables_to_csv.sh /tmp/kml_sqlite_unpack178997/backup-1759990021487.sqlite
 set -euo pipefail
@@ -1,6 +1,8 @@
 #!/usr/bin/env bash
 # pg_stage_import_all.sh
 # Imports the location, network, and route CSVs into Postgres staging tables (all rows for s22b, source_id=4).
+# Superseded by sqlite_stage_import.py, which streams the SQLite tables straight
+# into the same staging tables with COPY (no intermediate CSV files).
 #
 # Usage:
 #   PGHOST=... PGPORT=... PGUSER=... PGPASSWORD=... ./pg_stage_import_all.sh \
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+WiGLE SQLite -> PostgreSQL Staging Import for ShadowCheck
+Python replacement for export_sqlite_all_tables_to_csv.sh + pg_stage_import_all.sh
+
+Every table is read from its own SQLite cursor and piped into COPY FROM STDIN
+on its own PostgreSQL connection, all tables concurrently, with no
+intermediate CSV files. Location and route rows pass through the shared
+validation stage on the way, like in wigle_sqlite_parser.py. Once all
+staging tables are loaded, they are merged into app.locations_legacy,
+app.networks_legacy and app.routes_legacy in one transaction.
+Locations and networks are staged and merged as in pg_stage_import_all.sh.
+Routes differ: the shell pipeline expects per-route summaries (route_id,
+start/end time and position, distance, speed), whereas the WiGLE SQLite
+route table holds raw points, so those points (_id, run_id, visible counts,
+position, time) are staged and merged as they are.
+"""
+
+import sys
+import os
+import json
+import time
+import psycopg2
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from pg_copy import CopyStream
+from wigle_sqlite_parser import extract_sqlite_from_zip, location_validator, open_wigle_database, route_validator
+
+# Defaults of the shell pipeline (the s22b device, source_id = 4)
+DEFAULT_TAG = 's22b'
+DEFAULT_SOURCE_ID = 4
+
+# SQLite table -> (columns, staging table DDL column definitions)
+STAGE_TABLES = {
+    'location': (
+        ('_id', 'bssid', 'level', 'lat', 'lon', 'altitude', 'accuracy', 'time', 'external', 'mfgrid'),
+        """
+            _id           bigint,
+            bssid         text,
+            level         integer,
+            lat           double precision,
+            lon           double precision,
+            altitude      double precision,
+            accuracy      double precision,
+            time          bigint,
+            external      integer,
+            mfgrid        integer
+        """
+    ),
+    'network': (
+        ('bssid', 'ssid', 'frequency', 'capabilities', 'lasttime', 'lastlat', 'lastlon',
+         'type', 'bestlevel', 'bestlat', 'bestlon', 'rcois', 'mfgrid', 'service'),
+        """
+            bssid         text,
+            ssid          text,
+            frequency     integer,
+            capabilities  text,
+            lasttime      bigint,
+            lastlat       double precision,
+            lastlon       double precision,
+            type          text,
+            bestlevel     integer,
+            bestlat       double precision,
+            bestlon       double precision,
+            rcois         text,
+            mfgrid        integer,
+            service       text
+        """
+    ),
+    'route': (
+        ('_id', 'run_id', 'wifi_visible', 'cell_visible', 'bt_visible',
+         'lat', 'lon', 'altitude', 'accuracy', 'time'),
+        """
+            _id           bigint,
+            run_id        integer,
+            wifi_visible  integer,
+            cell_visible  integer,
+            bt_visible    integer,
+            lat           double precision,
+            lon           double precision,
+            altitude      double precision,
+            accuracy      double precision,
+            time          bigint
+        """
+    ),
+}
+
+# Validation stage of the observation tables (see shared/validation.py)
+STAGE_VALIDATORS = {
+    'location': location_validator,
+    'route': route_validator,
+}
+
+# Merge statements ({staging} is the staging table); location and network
+# follow pg_stage_import_all.sh, route merges raw route points
+STAGE_MERGES = {
+    'location': """
+        INSERT INTO app.locations_legacy (
+          source_id, _id, bssid, level, lat, lon, altitude, accuracy, time, external, mfgrid
+        )
+        SELECT %s, s._id, UPPER(NULLIF(s.bssid, '')), s.level, s.lat, s.lon,
+               s.altitude, s.accuracy, s.time, s.external, s.mfgrid
+        FROM {staging} s
+    """,
+    'network': """
+        INSERT INTO app.networks_legacy (
+          source_id, bssid, ssid, frequency, capabilities, lasttime, lastlat, lastlon,
+          type, bestlevel, bestlat, bestlon, rcois, mfgrid, service
+        )
+        SELECT %s, UPPER(NULLIF(s.bssid, '')), s.ssid, s.frequency, s.capabilities,
+               s.lasttime, s.lastlat, s.lastlon, s.type, s.bestlevel, s.bestlat,
+               s.bestlon, s.rcois, s.mfgrid, s.service
+        FROM {staging} s
+    """,
+    'route': """
+        INSERT INTO app.routes_legacy (
+          source_id, _id, run_id, wifi_visible, cell_visible, bt_visible,
+          lat, lon, altitude, accuracy, time
+        )
+        SELECT %s, s._id, s.run_id, s.wifi_visible, s.cell_visible, s.bt_visible,
+               s.lat, s.lon, s.altitude, s.accuracy, s.time
+        FROM {staging} s
+    """,
+}
+
+def staging_table(table, tag):
+    """Name of the staging table of a SQLite table"""
+    return f"app.{table}_staging_{tag}"
+
+def stage_table(db_path, table, tag, db_config):
+    """
+    Pipe one SQLite table into its staging table with COPY
+    Runs on its own SQLite and PostgreSQL connections. Rows of tables in
+    STAGE_VALIDATORS are validated on the way; rejected rows are not staged.
+    Returns (rows copied, seconds, rows dropped by validation)
+    """
+    columns, ddl = STAGE_TABLES[table]
+    staging = staging_table(table, tag)
+    started = time.monotonic()
+
+    sqlite_conn = open_wigle_database(db_path)
+    conn = psycopg2.connect(**db_config)
+    cur = conn.cursor()
+
+    try:
+        cur.execute(f"DROP TABLE IF EXISTS {staging}")
+        cur.execute(f"CREATE TABLE {staging} ({ddl})")
+
+        rows = sqlite_conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        validator = STAGE_VALIDATORS[table]() if table in STAGE_VALIDATORS else None
+        if validator is not None:
+            records = validator.stream(dict(row) for row in rows)
+            rows = (tuple(record[c] for c in columns) for record in records)
+
+        stream = CopyStream(rows)
+        cur.copy_expert(f"COPY {staging} ({', '.join(columns)}) FROM STDIN", stream)
+        conn.commit()
+
+        elapsed = time.monotonic() - started
+        print(f"  ✓ {table} -> {staging}: {stream.rows:,} rows in {elapsed:.1f}s", file=sys.stderr)
+        if validator is not None:
+            print(f"    Validation {table}: {validator.summary()}", file=sys.stderr)
+        return stream.rows, elapsed, validator.dropped if validator is not None else 0
+
+    except Exception as e:
+        conn.rollback()
+        print(f"  ✗ Error staging {table}: {e}", file=sys.stderr)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+        sqlite_conn.close()
+
+def merge_staging(tables, tag, source_id, db_config, keep_staging=False):
+    """
+    Merge staged tables into the legacy tables in one transaction, then
+    drop the staging tables unless keep_staging is set.
+    Returns rows inserted per table
+    """
+    conn = psycopg2.connect(**db_config)
+    cur = conn.cursor()
+    merged = {}
+
+    try:
+        for table in tables:
+            cur.execute(STAGE_MERGES[table].format(staging=staging_table(table, tag)), (source_id,))
+            merged[table] = cur.rowcount
+            print(f"  ✓ Merged {merged[table]:,} {table} rows (source_id={source_id})", file=sys.stderr)
+
+        if not keep_staging:
+            for table in tables:
+                cur.execute(f"DROP TABLE IF EXISTS {staging_table(table, tag)}")
+
+        conn.commit()
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error merging staging tables: {e}", file=sys.stderr)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    return merged
+
+def import_backup(db_path, db_config, tag=DEFAULT_TAG, source_id=DEFAULT_SOURCE_ID, keep_staging=False):
+    """
+    Stage every WiGLE table concurrently, then merge them
+    Returns per-table staged rows, load seconds, rows rejected by validation
+    and merged rows
+    """
+    conn = open_wigle_database(db_path)
+    try:
+        present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    finally:
+        conn.close()
+    tables = [table for table in STAGE_TABLES if table in present]
+
+    print(f"Staging {', '.join(tables)} concurrently...", file=sys.stderr)
+    with ThreadPoolExecutor(max_workers=len(tables) or 1) as pool:
+        futures = {table: pool.submit(stage_table, db_path, table, tag, db_config) for table in tables}
+        staged = {table: future.result() for table, future in futures.items()}
+
+    print("Merging into legacy tables...", file=sys.stderr)
+    merged = merge_staging(tables, tag, source_id, db_config, keep_staging)
+
+    return {
+        table: {'staged': staged[table][0], 'seconds': round(staged[table][1], 2),
+                'rejected': staged[table][2], 'merged': merged[table]}
+        for table in tables
+    }
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: sqlite_stage_import.py <backup.sqlite or backup.zip> [--source-id N] [--tag TAG] [--keep-staging]")
+        sys.exit(1)
+
+    input_file = sys.argv[1]
+    source_id = DEFAULT_SOURCE_ID
+    if '--source-id' in sys.argv:
+        source_id = int(sys.argv[sys.argv.index('--source-id') + 1])
+    tag = DEFAULT_TAG
+    if '--tag' in sys.argv:
+        tag = sys.argv[sys.argv.index('--tag') + 1]
+    keep_staging = '--keep-staging' in sys.argv
+
+    if not os.path.exists(input_file):
+        print(f"Error: File {input_file} not found")
+        sys.exit(1)
+
+    # Database configuration from environment
+    db_config = {
+        'host': os.getenv('DB_HOST', '127.0.0.1'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'shadowcheck'),
+        'user': os.getenv('DB_USER', 'shadowcheck_user'),
+        'password': os.getenv('DB_PASSWORD', 'DJvHRxGZ2e+rDgkO4LWXZG1np80rU4daQNQpQ3PwvZ8=')
+    }
+
+    db_path = input_file
+    temp_db = None
+
+    if input_file.endswith('.zip'):
+        print(f"Extracting SQLite database from {input_file}...", file=sys.stderr)
+        temp_db = extract_sqlite_from_zip(input_file)
+        db_path = temp_db
+
+    try:
+        stats = import_backup(db_path, db_config, tag=tag, source_id=source_id, keep_staging=keep_staging)
+
+        # Output JSON for API response
+        print(json.dumps({
+            'ok': True,
+            'file': os.path.basename(input_file),
+            'stats': stats
+        }))
+
+    finally:
+        # Clean up temporary database file
+        if temp_db and os.path.exists(temp_db):
+            os.unlink(temp_db)
+
+if __name__ == '__main__':
+    main()
@@ -7,42 +7,302 @@ Extracts data from WiGLE Android app SQLite database backups (supports .zip file
 import sqlite3
 import sys
 import os
+import shutil
 import zipfile
 import tempfile
 import psycopg2
 import json
+import hashlib
+import itertools
 from datetime import datetime
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from load_checkpoint import LoadCheckpoint, file_hash, require_table
+from pg_copy import copy_rows
+from validation import ObservationValidator
+
+# Bytes of the database file SQLite may memory-map for read scans
+SQLITE_MMAP_SIZE = 1 << 30
+
+# Buffer size for copying a database out of a zip archive
+ZIP_COPY_BUFFER = 1 << 20
 
 def extract_sqlite_from_zip(zip_path):
-    """Extract SQLite database from zip file"""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            # Find the SQLite database file
-            db_files = [f for f in zip_ref.namelist() if f.endswith('.sqlite') or f.endswith('.db')]
-
-            if not db_files:
-                # Try to find any file that might be a database
-                db_files = [f for f in zip_ref.namelist() if not f.endswith('/')]
-
-            if not db_files:
-                raise Exception("No database file found in zip archive")
-
-            db_file = db_files[0]
-            zip_ref.extract(db_file, tmpdir)
-            extracted_path = os.path.join(tmpdir, db_file)
-
-            # Copy to a temporary file that will persist
-            temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.sqlite')
-            with open(extracted_path, 'rb') as src:
-                temp_db.write(src.read())
-            temp_db.close()
-
-            return temp_db.name
-
-def parse_wigle_database(db_path):
-    """Parse WiGLE SQLite database and extract networks and locations"""
-    conn = sqlite3.connect(db_path)
+    """
+    Extract SQLite database from zip file
+    The archive member is streamed straight into a single temporary file;
+    the caller removes it when done.
+    Returns the temporary file path
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        # Find the SQLite database file
+        db_files = [f for f in zip_ref.namelist() if f.endswith('.sqlite') or f.endswith('.db')]
+
+        if not db_files:
+            # Try to find any file that might be a database
+            db_files = [f for f in zip_ref.namelist() if not f.endswith('/')]
+
+        if not db_files:
+            raise Exception("No database file found in zip archive")
+
+        temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.sqlite')
+        try:
+            with zip_ref.open(db_files[0]) as src, temp_db:
+                shutil.copyfileobj(src, temp_db, ZIP_COPY_BUFFER)
+        except Exception:
+            os.unlink(temp_db.name)
+            raise
+
+        return temp_db.name
+
+def open_wigle_database(db_path):
+    """
+    Open a WiGLE backup read-only with Row access
+    Backups are never written while parsed, so the database is opened
+    immutable (no locking or change detection) and memory-mapped.
+    """
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(db_path))}?mode=ro&immutable=1", uri=True)
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    return conn
+
+NETWORK_SQL = """
+    SELECT bssid, ssid, frequency, capabilities, type,
+           lasttime, lastlat, lastlon, bestlat, bestlon, bestlevel
+    FROM network
+    WHERE bssid IS NOT NULL
+"""
+
+LOCATION_SQL = """
+    SELECT _id, bssid, level, lat, lon, altitude, accuracy, time
+    FROM location
+    WHERE bssid IS NOT NULL
+"""
+
+NETWORK_UPSERT_SQL = """
+    INSERT INTO app.networks_legacy
+    (bssid, ssid, frequency, capabilities, type, lasttime, lastlat, lastlon)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (bssid) DO UPDATE SET
+        ssid = COALESCE(EXCLUDED.ssid, app.networks_legacy.ssid),
+        frequency = COALESCE(EXCLUDED.frequency, app.networks_legacy.frequency),
+        capabilities = COALESCE(EXCLUDED.capabilities, app.networks_legacy.capabilities),
+        lasttime = GREATEST(EXCLUDED.lasttime, app.networks_legacy.lasttime),
+        lastlat = COALESCE(EXCLUDED.lastlat, app.networks_legacy.lastlat),
+        lastlon = COALESCE(EXCLUDED.lastlon, app.networks_legacy.lastlon)
+"""
+
+LOCATION_INSERT_SQL = """
+    INSERT INTO app.locations_legacy
+    (bssid, level, lat, lon, altitude, accuracy, time)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Rows per keyset page when streaming the location table
+LOCATION_PAGE_SIZE = 10000
+
+# Source rows per committed range in checkpointed (resumable) loads
+CHECKPOINT_BATCH_SIZE = 50000
+
+# Rows per COPY batch in the bulk paths
+COPY_BATCH_SIZE = 50000
+
+def location_validator():
+    """
+    Validation stage for location records: rows with a missing, out of
+    range or null-island position, or an impossible jump from the fixes
+    around them, are dropped; implausible altitude, level and time values
+    are cleared
+    """
+    return ObservationValidator(altitude='altitude', accuracy='accuracy', level='level', time='time')
+
+def route_validator():
+    """
+    Validation stage for route points (GPS fixes): the location checks
+    without a signal level
+    """
+    return ObservationValidator(altitude='altitude', accuracy='accuracy', time='time')
+
+def network_from_row(row):
+    """Build a network record from a network table row"""
+    return {
+        'bssid': row['bssid'],
+        'ssid': row['ssid'] if row['ssid'] else None,
+        'frequency': row['frequency'] if row['frequency'] else None,
+        'capabilities': row['capabilities'],
+        'network_type': row['type'] if 'type' in row.keys() else 'W',
+        'last_seen': row['lasttime'] if row['lasttime'] else None,
+        'last_lat': row['lastlat'] if 'lastlat' in row.keys() else None,
+        'last_lon': row['lastlon'] if 'lastlon' in row.keys() else None,
+    }
+
+def location_from_row(row):
+    """Build a location record from a location table row"""
+    return {
+        'bssid': row['bssid'],
+        'level': row['level'] if row['level'] else None,
+        'lat': row['lat'],
+        'lon': row['lon'],
+        'altitude': row['altitude'] if row['altitude'] else 0.0,
+        'accuracy': row['accuracy'] if row['accuracy'] else None,
+        'time': row['time'] if row['time'] else None,
+    }
+
+def network_params(network):
+    """NETWORK_UPSERT_SQL parameters for a network record"""
+    return (
+        network['bssid'],
+        network.get('ssid'),
+        network.get('frequency'),
+        network.get('capabilities'),
+        network.get('network_type', 'W'),
+        network.get('last_seen'),
+        network.get('last_lat'),
+        network.get('last_lon')
+    )
+
+def location_params(location):
+    """LOCATION_INSERT_SQL parameters for a location record"""
+    return (
+        location['bssid'],
+        location.get('level'),
+        location['lat'],
+        location['lon'],
+        location.get('altitude', 0.0),
+        location.get('accuracy'),
+        location.get('time')
+    )
+
+# WiGLE table -> (query, row converter, insert statement, parameters, stats key)
+WIGLE_TABLES = {
+    'network': (NETWORK_SQL, network_from_row, NETWORK_UPSERT_SQL, network_params, 'networks'),
+    'location': (LOCATION_SQL, location_from_row, LOCATION_INSERT_SQL, location_params, 'locations'),
+}
+
+class WigleLocationStream:
+    """
+    Lazily iterate the location table with keyset pagination over _id
+
+    Each page is an indexed range query (_id > last seen _id ORDER BY _id
+    LIMIT page_size), so every row is read exactly once, nothing is capped
+    and only one page is held in memory. len() runs a COUNT(*) over the same
+    query so progress reporting keeps working.
+    """
+
+    def __init__(self, db_path, page_size=LOCATION_PAGE_SIZE, after_id=-1):
+        self.db_path = db_path
+        self.page_size = page_size
+        self.after_id = after_id
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            conn = open_wigle_database(self.db_path)
+            try:
+                self._count = conn.execute(
+                    f"SELECT COUNT(*) FROM ({LOCATION_SQL} AND _id > ?)", (self.after_id,)
+                ).fetchone()[0]
+            finally:
+                conn.close()
+        return self._count
+
+    def __iter__(self):
+        conn = open_wigle_database(self.db_path)
+        try:
+            last_id = self.after_id
+            while True:
+                rows = conn.execute(
+                    f"{LOCATION_SQL} AND _id > ? ORDER BY _id LIMIT ?",
+                    (last_id, self.page_size)
+                ).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1]['_id']
+                for row in rows:
+                    yield location_from_row(row)
+        finally:
+            conn.close()
+
+# Per-device import watermarks: WiGLE backups are cumulative, so the next
+# backup from the same device only needs the rows after these
+# Created by schema/ingest_checkpoints.sql, not at runtime
+WATERMARK_TABLE = "app.wigle_import_watermarks"
+WATERMARK_SCHEMA_FILE = "schema/ingest_checkpoints.sql"
+
+WATERMARK_UPSERT_SQL = """
+    INSERT INTO app.wigle_import_watermarks (source_key, max_id, max_time, filename)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (source_key) DO UPDATE SET
+        max_id = GREATEST(EXCLUDED.max_id, app.wigle_import_watermarks.max_id),
+        max_time = GREATEST(EXCLUDED.max_time, app.wigle_import_watermarks.max_time),
+        filename = EXCLUDED.filename,
+        updated_at = NOW()
+"""
+
+def device_key(db_path):
+    """
+    Identify the device a backup came from
+    Backups are cumulative, so every backup of one device starts with the
+    same location history; the key hashes its first location row.
+    Returns None for a backup without locations
+    """
+    conn = open_wigle_database(db_path)
+    try:
+        row = conn.execute(
+            "SELECT bssid, lat, lon, time FROM location ORDER BY _id LIMIT 1"
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return hashlib.sha256(repr(tuple(row)).encode('utf-8')).hexdigest()[:32]
+
+def location_high_water(db_path):
+    """
+    Highest location _id and time in a backup
+    Returns (max_id, max_time), or None when there are no locations
+    """
+    conn = open_wigle_database(db_path)
+    try:
+        row = conn.execute("SELECT MAX(_id), MAX(time) FROM location").fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    return None if row[0] is None else (row[0], row[1])
+
+def get_watermark(db_config, source_key):
+    """
+    Watermark recorded by the last successful import from source_key
+    Returns (max_id, max_time), or None for a device not seen before
+    """
+    conn = psycopg2.connect(**db_config)
+    cur = conn.cursor()
+    try:
+        require_table(cur, WATERMARK_TABLE, WATERMARK_SCHEMA_FILE)
+        cur.execute(
+            "SELECT max_id, max_time FROM app.wigle_import_watermarks WHERE source_key = %s",
+            (source_key,)
+        )
+        row = cur.fetchone()
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    return tuple(row) if row else None
+
+def parse_wigle_database(db_path, since=None):
+    """
+    Parse WiGLE SQLite database and extract networks and locations
+    networks is a list; locations is a lazy WigleLocationStream (or an
+    empty list when the table is absent). since=(max_id, max_time) from a
+    previous import restricts the result to locations after max_id and
+    networks last seen at or after max_time.
+    """
+    conn = open_wigle_database(db_path)
     cur = conn.cursor()
 
     # Get table names
@@ -56,59 +316,112 @@ def parse_wigle_database(db_path):
     # Parse networks table (if exists)
     if 'network' in tables:
         print(f"Parsing networks table...", file=sys.stderr)
-        cur.execute("""
-            SELECT bssid, ssid, frequency, capabilities, type,
-                   lasttime, lastlat, lastlon, bestlat, bestlon, bestlevel
-            FROM network
-            WHERE bssid IS NOT NULL
-        """)
+        if since:
+            cur.execute(f"{NETWORK_SQL} AND lasttime >= ?", (since[1],))
+        else:
+            cur.execute(NETWORK_SQL)
 
         for row in cur.fetchall():
-            network = {
-                'bssid': row['bssid'],
-                'ssid': row['ssid'] if row['ssid'] else None,
-                'frequency': row['frequency'] if row['frequency'] else None,
-                'capabilities': row['capabilities'],
-                'network_type': row['type'] if 'type' in row.keys() else 'W',
-                'last_seen': row['lasttime'] if row['lasttime'] else None,
-                'last_lat': row['lastlat'] if 'lastlat' in row.keys() else None,
-                'last_lon': row['lastlon'] if 'lastlon' in row.keys() else None,
-            }
-            networks.append(network)
-
-    # Parse location table (if exists)
-    if 'location' in tables:
-        print(f"Parsing location table...", file=sys.stderr)
-        cur.execute("""
-            SELECT bssid, level, lat, lon, altitude, accuracy, time
-            FROM location
-            WHERE bssid IS NOT NULL
-              AND lat IS NOT NULL
-              AND lon IS NOT NULL
-              AND lat BETWEEN -90 AND 90
-              AND lon BETWEEN -180 AND 180
-              AND NOT (lat = 0 AND lon = 0)
-            LIMIT 1000000
-        """)
+            networks.append(network_from_row(row))
 
-        for row in cur.fetchall():
-            location = {
-                'bssid': row['bssid'],
-                'level': row['level'] if row['level'] else None,
-                'lat': row['lat'],
-                'lon': row['lon'],
-                'altitude': row['altitude'] if row['altitude'] else 0.0,
-                'accuracy': row['accuracy'] if row['accuracy'] else None,
-                'time': row['time'] if row['time'] else None,
-            }
-            locations.append(location)
+    # Stream location table (if exists) page by page while it is loaded
+    if 'location' in tables:
+        print("Streaming location table...", file=sys.stderr)
+        after_id = since[0] if since else -1
+        locations = WigleLocationStream(db_path, after_id=after_id)
 
     conn.close()
 
     return networks, locations
 
-def load_to_database(source_filename, networks, locations, db_config):
-    """Load parsed data directly into production tables"""
+# Set-based networks_legacy upsert: networks are COPYed into a temp table,
+# collapsed to one row per BSSID the way consecutive per-row upserts would
+# leave it (first type, latest non-null values, newest lasttime) and merged
+# with the same COALESCE/GREATEST rules as NETWORK_UPSERT_SQL
+NETWORK_COPY_COLUMNS = (
+    'bssid', 'ssid', 'frequency', 'capabilities', 'type', 'lasttime', 'lastlat', 'lastlon'
+)
+
+NETWORK_TEMP_TABLE = """
+    CREATE TEMP TABLE networks_legacy_tmp (
+        ord BIGSERIAL,
+        bssid TEXT,
+        ssid TEXT,
+        frequency INTEGER,
+        capabilities TEXT,
+        type TEXT,
+        lasttime BIGINT,
+        lastlat DOUBLE PRECISION,
+        lastlon DOUBLE PRECISION
+    ) ON COMMIT DROP
+"""
+
+NETWORK_MERGE = """
+    INSERT INTO app.networks_legacy
+    (bssid, ssid, frequency, capabilities, type, lasttime, lastlat, lastlon)
+    SELECT bssid,
+           (array_agg(ssid ORDER BY ord DESC) FILTER (WHERE ssid IS NOT NULL))[1],
+           (array_agg(frequency ORDER BY ord DESC) FILTER (WHERE frequency IS NOT NULL))[1],
+           (array_agg(capabilities ORDER BY ord DESC) FILTER (WHERE capabilities IS NOT NULL))[1],
+           (array_agg(type ORDER BY ord))[1],
+           MAX(lasttime),
+           (array_agg(lastlat ORDER BY ord DESC) FILTER (WHERE lastlat IS NOT NULL))[1],
+           (array_agg(lastlon ORDER BY ord DESC) FILTER (WHERE lastlon IS NOT NULL))[1]
+    FROM networks_legacy_tmp
+    GROUP BY bssid
+    ON CONFLICT (bssid) DO UPDATE SET
+        ssid = COALESCE(EXCLUDED.ssid, app.networks_legacy.ssid),
+        frequency = COALESCE(EXCLUDED.frequency, app.networks_legacy.frequency),
+        capabilities = COALESCE(EXCLUDED.capabilities, app.networks_legacy.capabilities),
+        lasttime = GREATEST(EXCLUDED.lasttime, app.networks_legacy.lasttime),
+        lastlat = COALESCE(EXCLUDED.lastlat, app.networks_legacy.lastlat),
+        lastlon = COALESCE(EXCLUDED.lastlon, app.networks_legacy.lastlon)
+"""
+
+def upsert_networks(cur, networks):
+    """Upsert networks one row at a time; returns the number processed"""
+    processed = 0
+    for network in networks:
+        try:
+            cur.execute(NETWORK_UPSERT_SQL, network_params(network))
+            processed += 1
+
+            if processed % 1000 == 0:
+                print(f"  {processed} networks processed...", file=sys.stderr)
+
+        except Exception as e:
+            print(f"Error inserting network {network['bssid']}: {e}", file=sys.stderr)
+            continue
+    return processed
+
+def bulk_upsert_networks(cur, networks, batch_size=COPY_BATCH_SIZE):
+    """
+    Upsert networks with COPY into a temp table and one merge statement
+    Falls back to upsert_networks if the COPY or merge is rejected.
+    Returns the number of distinct BSSIDs inserted or updated
+    """
+    cur.execute("SAVEPOINT networks_bulk")
+    try:
+        cur.execute(NETWORK_TEMP_TABLE)
+        copy_rows(cur, 'networks_legacy_tmp', NETWORK_COPY_COLUMNS,
+                  (network_params(network) for network in networks), batch_size)
+        cur.execute(NETWORK_MERGE)
+        merged = cur.rowcount
+        cur.execute("DROP TABLE networks_legacy_tmp")
+        cur.execute("RELEASE SAVEPOINT networks_bulk")
+        return merged
+    except psycopg2.Error as e:
+        cur.execute("ROLLBACK TO SAVEPOINT networks_bulk")
+        print(f"Bulk network upsert rejected ({e}); falling back to per-row upserts", file=sys.stderr)
+    return upsert_networks(cur, networks)
+
+def load_to_database(source_filename, networks, locations, db_config, watermark=None, bulk_networks=False):
+    """
+    Load parsed data directly into production tables
+    watermark=(source_key, max_id, max_time) is recorded in the same
+    transaction as the rows; bulk_networks upserts networks with one
+    set-based statement instead of a round trip per network
+    """
     conn = psycopg2.connect(**db_config)
     cur = conn.cursor()
 
@@ -116,67 +429,41 @@ def load_to_database(source_filename, networks, locations, db_config):
     locations_inserted = 0
 
     try:
+        # Fail before loading anything if the watermark table is missing
+        if watermark:
+            require_table(cur, WATERMARK_TABLE, WATERMARK_SCHEMA_FILE)
+
         print(f"Loading {len(networks)} networks into production...", file=sys.stderr)
 
         # Insert networks directly into networks_legacy
-        for network in networks:
-            try:
-                cur.execute("""
-                    INSERT INTO app.networks_legacy
-                    (bssid, ssid, frequency, capabilities, type, lasttime, lastlat, lastlon)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (bssid) DO UPDATE SET
-                        ssid = COALESCE(EXCLUDED.ssid, app.networks_legacy.ssid),
-                        frequency = COALESCE(EXCLUDED.frequency, app.networks_legacy.frequency),
-                        capabilities = COALESCE(EXCLUDED.capabilities, app.networks_legacy.capabilities),
-                        lasttime = GREATEST(EXCLUDED.lasttime, app.networks_legacy.lasttime),
-                        lastlat = COALESCE(EXCLUDED.lastlat, app.networks_legacy.lastlat),
-                        lastlon = COALESCE(EXCLUDED.lastlon, app.networks_legacy.lastlon)
-                """, (
-                    network['bssid'],
-                    network.get('ssid'),
-                    network.get('frequency'),
-                    network.get('capabilities'),
-                    network.get('network_type', 'W'),
-                    network.get('last_seen'),
-                    network.get('last_lat'),
-                    network.get('last_lon')
-                ))
-                networks_inserted += 1
-
-                if networks_inserted % 1000 == 0:
-                    print(f"  {networks_inserted} networks processed...", file=sys.stderr)
-
-            except Exception as e:
-                print(f"Error inserting network {network['bssid']}: {e}", file=sys.stderr)
-                continue
+        if bulk_networks:
+            networks_inserted = bulk_upsert_networks(cur, networks)
+        else:
+            networks_inserted = upsert_networks(cur, networks)
 
-        print(f"Loading {len(locations)} locations into production...", file=sys.stderr)
+        total_locations = len(locations)
+        print(f"Loading {total_locations} locations into production...", file=sys.stderr)
 
-        # Insert locations directly into locations_legacy
+        # Insert locations directly into locations_legacy; a savepoint per row
+        # skips a failing row without aborting the whole transaction
         for location in locations:
+            cur.execute("SAVEPOINT wigle_row")
             try:
-                cur.execute("""
-                    INSERT INTO app.locations_legacy
-                    (bssid, level, lat, lon, altitude, accuracy, time)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    location['bssid'],
-                    location.get('level'),
-                    location['lat'],
-                    location['lon'],
-                    location.get('altitude', 0.0),
-                    location.get('accuracy'),
-                    location.get('time')
-                ))
+                cur.execute(LOCATION_INSERT_SQL, location_params(location))
+                cur.execute("RELEASE SAVEPOINT wigle_row")
                 locations_inserted += 1
 
                 if locations_inserted % 10000 == 0:
-                    print(f"  {locations_inserted} locations processed...", file=sys.stderr)
+                    progress = (locations_inserted / total_locations) * 100 if total_locations else 100.0
+                    print(f"  {locations_inserted}/{total_locations} locations processed ({progress:.1f}%)...",
+                          file=sys.stderr)
 
-            except Exception as e:
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT wigle_row")
                 print(f"Error inserting location for {location['bssid']}: {e}", file=sys.stderr)
-                continue
+
+        if watermark:
+            cur.execute(WATERMARK_UPSERT_SQL, tuple(watermark) + (source_filename,))
 
         conn.commit()
         print(f"✓ Loaded {source_filename}: {networks_inserted} networks, {locations_inserted} locations", file=sys.stderr)
@@ -191,12 +478,264 @@ def load_to_database(source_filename, networks, locations, db_config):
 
     return {'networks': networks_inserted, 'locations': locations_inserted}
 
+# Route points are COPYed into a temp table and merged into routes_legacy,
+# skipping points already imported so cumulative backups stay idempotent
+ROUTE_COLUMNS = (
+    '_id', 'run_id', 'wifi_visible', 'cell_visible', 'bt_visible',
+    'lat', 'lon', 'altitude', 'accuracy', 'time'
+)
+
+ROUTE_SQL = """
+    SELECT _id, run_id, wifi_visible, cell_visible, bt_visible,
+           lat, lon, altitude, accuracy, time
+    FROM route
+    WHERE lat IS NOT NULL
+      AND lon IS NOT NULL
+"""
+
+ROUTE_TEMP_TABLE = """
+    CREATE TEMP TABLE wigle_route_tmp (
+        _id BIGINT,
+        run_id INTEGER,
+        wifi_visible INTEGER,
+        cell_visible INTEGER,
+        bt_visible INTEGER,
+        lat DOUBLE PRECISION,
+        lon DOUBLE PRECISION,
+        altitude DOUBLE PRECISION,
+        accuracy DOUBLE PRECISION,
+        time BIGINT
+    ) ON COMMIT DROP
+"""
+
+# Parameters: (source_id, source_id); a point is a duplicate only within the
+# same source, since _id and run_id are local to each device
+ROUTE_MERGE = """
+    INSERT INTO app.routes_legacy
+    (source_id, _id, run_id, wifi_visible, cell_visible, bt_visible, lat, lon, altitude, accuracy, time)
+    SELECT %s::integer, t._id, t.run_id, t.wifi_visible, t.cell_visible, t.bt_visible,
+           t.lat, t.lon, t.altitude, t.accuracy, t.time
+    FROM wigle_route_tmp t
+    WHERE NOT EXISTS (
+        SELECT 1 FROM app.routes_legacy r
+        WHERE r.source_id IS NOT DISTINCT FROM %s::integer
+          AND r._id = t._id AND r.run_id = t.run_id AND r.time = t.time
+    )
+"""
+
+# Created by schema/wigle_routes.sql, not at runtime
+ROUTE_POLYLINE_TABLE = "app.wigle_route_polylines"
+ROUTE_POLYLINE_SCHEMA_FILE = "schema/wigle_routes.sql"
+
+ROUTE_POLYLINE_UPSERT_SQL = """
+    INSERT INTO app.wigle_route_polylines
+    (source_key, run_id, point_count, start_time, end_time, polyline, filename)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (source_key, run_id) DO UPDATE SET
+        point_count = EXCLUDED.point_count,
+        start_time = EXCLUDED.start_time,
+        end_time = EXCLUDED.end_time,
+        polyline = EXCLUDED.polyline,
+        filename = EXCLUDED.filename,
+        updated_at = NOW()
+"""
+
+# Decimal places kept by the encoded polylines (1e-5 degrees ~ 1.1 m)
+POLYLINE_PRECISION = 5
+
+def _encode_polyline_value(value, out):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """
+    Encode (lat, lon) points with the Encoded Polyline Algorithm Format
+    Points that round to the same position as the previous one are dropped.
+    Returns (polyline, number of points encoded)
+    """
+    factor = 10 ** precision
+    out = []
+    count = 0
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        lat_e = int(round(lat * factor))
+        lon_e = int(round(lon * factor))
+        if count and lat_e == prev_lat and lon_e == prev_lon:
+            continue
+        _encode_polyline_value(lat_e - prev_lat, out)
+        _encode_polyline_value(lon_e - prev_lon, out)
+        prev_lat, prev_lon = lat_e, lon_e
+        count += 1
+    return ''.join(out), count
+
+def load_routes_to_database(db_path, source_filename, source_key, db_config, since=None,
+                            source_id=None, batch_size=COPY_BATCH_SIZE):
+    """
+    Stream the route table into app.routes_legacy (tagged with source_id)
+    with COPY and store one encoded polyline per run in
+    app.wigle_route_polylines.
+    since=(max_id, max_time) limits the import to points recorded after
+    max_time; polylines are rebuilt from every point of the runs touched.
+    Points are passed through route_validator() first, so null-island,
+    out of range and impossible-speed fixes are neither stored nor drawn.
+    """
+    sqlite_conn = open_wigle_database(db_path)
+    tables = [row[0] for row in sqlite_conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    stats = {'routes': 0, 'route_runs': 0}
+    if 'route' not in tables:
+        sqlite_conn.close()
+        return stats
+
+    conn = psycopg2.connect(**db_config)
+    cur = conn.cursor()
+
+    try:
+        # Fail before copying anything if the polyline table is missing
+        require_table(cur, ROUTE_POLYLINE_TABLE, ROUTE_POLYLINE_SCHEMA_FILE)
+
+        sql, params = ROUTE_SQL, ()
+        if since:
+            sql, params = f"{ROUTE_SQL} AND time > ?", (since[1],)
+
+        print("Copying route points...", file=sys.stderr)
+        cur.execute(ROUTE_TEMP_TABLE)
+        runs = set()
+        validator = route_validator()
+
+        def route_rows():
+            points = (dict(row) for row in sqlite_conn.execute(f"{sql} ORDER BY _id", params))
+            for point in validator.stream(points):
+                runs.add(point['run_id'])
+                yield tuple(point[c] for c in ROUTE_COLUMNS)
+
+        copy_rows(cur, 'wigle_route_tmp', ROUTE_COLUMNS, route_rows(), batch_size,
+                  on_batch=lambda n: print(f"  {n:,} route points copied...", file=sys.stderr))
+        cur.execute(ROUTE_MERGE, (source_id, source_id))
+        stats['routes'] = cur.rowcount
+
+        # Encode each touched run from all of its points in this backup
+        key = source_key or source_filename
+        points = route_validator().stream(
+            dict(row) for row in sqlite_conn.execute(f"{ROUTE_SQL} ORDER BY run_id, _id")
+        )
+        for run_id, run_points in itertools.groupby(points, key=lambda p: p['run_id']):
+            if run_id not in runs:
+                continue
+            run_points = list(run_points)
+            polyline, count = encode_polyline((p['lat'], p['lon']) for p in run_points)
+            cur.execute(ROUTE_POLYLINE_UPSERT_SQL, (
+                key, run_id, count, run_points[0]['time'], run_points[-1]['time'], polyline, source_filename
+            ))
+            stats['route_runs'] += 1
+
+        conn.commit()
+        print(f"Validation routes: {validator.summary()}", file=sys.stderr)
+        print(f"✓ Loaded {source_filename}: {stats['routes']} route points, {stats['route_runs']} runs", file=sys.stderr)
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error loading routes from {source_filename}: {e}", file=sys.stderr)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+        sqlite_conn.close()
+
+    return stats
+
+def resumable_load_to_database(db_path, source_filename, input_hash, db_config,
+                               batch_size=CHECKPOINT_BATCH_SIZE):
+    """
+    Load a WiGLE database in rowid ranges of batch_size source rows,
+    committing each range together with its checkpoint in
+    app.ingest_checkpoints. input_hash identifies the uploaded file (the
+    zip itself for backups), so rerunning it skips finished tables and
+    resumes unfinished ones after the last committed range instead of
+    inserting the same locations again.
+    """
+    sqlite_conn = open_wigle_database(db_path)
+    tables = [row[0] for row in sqlite_conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+
+    conn = psycopg2.connect(**db_config)
+    cur = conn.cursor()
+
+    stats = {'networks': 0, 'locations': 0}
+    validator = location_validator()
+
+    try:
+        journal = LoadCheckpoint(cur, input_hash, source_filename)
+        conn.commit()
+
+        for table, (sql, convert, insert_sql, params, key) in WIGLE_TABLES.items():
+            if table not in tables:
+                continue
+
+            last_rowid, completed = journal.position(table)
+            if completed:
+                print(f"Skipping {table}: already loaded", file=sys.stderr)
+                continue
+
+            high = sqlite_conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+            if last_rowid:
+                print(f"Resuming {table} after rowid {last_rowid:,}...", file=sys.stderr)
+            else:
+                print(f"Loading {table}...", file=sys.stderr)
+
+            for start in range(last_rowid + 1, high + 1, batch_size):
+                end = min(start + batch_size, high + 1)
+                rows = sqlite_conn.execute(f"{sql} AND rowid >= ? AND rowid < ? ORDER BY rowid", (start, end))
+                records = [convert(row) for row in rows]
+                if table == 'location':
+                    records = validator.apply(records)
+                for record in records:
+                    cur.execute("SAVEPOINT wigle_row")
+                    try:
+                        cur.execute(insert_sql, params(record))
+                        cur.execute("RELEASE SAVEPOINT wigle_row")
+                        stats[key] += 1
+                    except psycopg2.Error as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT wigle_row")
+                        print(f"Error inserting {table} row for {record['bssid']}: {e}", file=sys.stderr)
+                journal.advance(table, end - 1, len(records))
+                conn.commit()
+                print(f"  {table}: rowid {end - 1:,}/{high:,} committed", file=sys.stderr)
+
+            journal.complete(table)
+            conn.commit()
+
+        print(f"Validation locations: {validator.summary()}", file=sys.stderr)
+        print(f"✓ Loaded {source_filename}: {stats['networks']} networks, {stats['locations']} locations", file=sys.stderr)
+
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error loading {source_filename}: {e}", file=sys.stderr)
+        print("  Rerun the same file to resume from the last checkpoint", file=sys.stderr)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+        sqlite_conn.close()
+
+    return stats
+
 def main():
     if len(sys.argv) < 2:
-        print("Usage: wigle_sqlite_parser.py <wigle_db.zip or wigle_db.sqlite>")
+        print("Usage: wigle_sqlite_parser.py <wigle_db.zip or wigle_db.sqlite> [--resume] [--full] [--source KEY] [--source-id N] [--copy]")
         sys.exit(1)
 
     input_file = sys.argv[1]
+    resume = '--resume' in sys.argv
+    full = '--full' in sys.argv
+    bulk_networks = '--copy' in sys.argv
+    source_key = None
+    if '--source' in sys.argv:
+        source_key = sys.argv[sys.argv.index('--source') + 1]
+    source_id = None
+    if '--source-id' in sys.argv:
+        source_id = int(sys.argv[sys.argv.index('--source-id') + 1])
 
     if not os.path.exists(input_file):
         print(f"Error: File {input_file} not found")
@@ -221,13 +760,49 @@ def main():
         db_path = temp_db
 
     try:
-        print(f"Parsing WiGLE database...", file=sys.stderr)
-        networks, locations = parse_wigle_database(db_path)
-
-        print(f"Found {len(networks)} networks, {len(locations)} location observations", file=sys.stderr)
-
         source_filename = os.path.basename(input_file)
-        result = load_to_database(source_filename, networks, locations, db_config)
+
+        if resume:
+            # Routes first, as below: their merge is idempotent, so a rerun
+            # of the same file copies them again without duplicates
+            route_stats = load_routes_to_database(db_path, source_filename, source_key or device_key(db_path),
+                                                  db_config, source_id=source_id)
+            print(f"Hashing {source_filename} for checkpoints...", file=sys.stderr)
+            result = resumable_load_to_database(db_path, source_filename, file_hash(input_file), db_config)
+            result.update(route_stats)
+        else:
+            # Incremental import: only rows newer than the last backup
+            # from the same device (--full re-reads everything)
+            source_key = source_key or device_key(db_path)
+            high = location_high_water(db_path)
+            since = None
+            if source_key and not full:
+                since = get_watermark(db_config, source_key)
+                if since and (high is None or high[0] < since[0]):
+                    print("Backup is older than the recorded watermark; importing everything", file=sys.stderr)
+                    since = None
+                elif since:
+                    print(f"Importing rows after location _id {since[0]:,} (device {source_key})", file=sys.stderr)
+
+            print("Parsing WiGLE database...", file=sys.stderr)
+            networks, locations = parse_wigle_database(db_path, since=since)
+
+            print(f"Found {len(networks)} networks, {len(locations)} location observations", file=sys.stderr)
+
+            # Coordinate, signal and time checks run in vectorized batches
+            # while the locations are loaded
+            validator = location_validator()
+            locations = validator.stream(locations)
+
+            watermark = (source_key,) + high if source_key and high else None
+            # Routes first: their merge is idempotent, while the location
+            # load records the watermark that later imports start from
+            route_stats = load_routes_to_database(db_path, source_filename, source_key, db_config,
+                                                  since=since, source_id=source_id)
+            result = load_to_database(source_filename, networks, locations, db_config,
+                                      watermark=watermark, bulk_networks=bulk_networks)
+            print(f"Validation locations: {validator.summary()}", file=sys.stderr)
+            result.update(route_stats)
 
         # Output JSON for API response
         print(json.dumps({
@@ -0,0 +1,33 @@
+-- Load Checkpoint Journal
+-- Last committed rowid per input file and source table, written by the
+-- Kismet and WiGLE SQLite loaders in the same transaction as the rows so an
+-- interrupted load can resume exactly where it stopped
+
+CREATE TABLE IF NOT EXISTS app.ingest_checkpoints (
+    file_hash TEXT NOT NULL,          -- SHA-256 of the input file
+    table_name TEXT NOT NULL,         -- source table inside the file
+    filename TEXT,
+    last_rowid BIGINT NOT NULL DEFAULT 0,
+    rows_loaded BIGINT NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (file_hash, table_name)
+);
+
+COMMENT ON TABLE app.ingest_checkpoints IS
+'Resume points of checkpointed Kismet/WiGLE file loads (see pipelines/shared/load_checkpoint.py)';
+
+-- Per-device WiGLE import watermarks
+-- WiGLE Android backups are cumulative; the next backup from the same device
+-- (identified by a hash of its first location row, or --source) only imports
+-- locations after max_id and networks last seen at or after max_time
+CREATE TABLE IF NOT EXISTS app.wigle_import_watermarks (
+    source_key TEXT PRIMARY KEY,
+    max_id BIGINT NOT NULL,
+    max_time BIGINT,
+    filename TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE app.wigle_import_watermarks IS
+'Highest location _id/time imported per WiGLE device (see pipelines/wigle/wigle_sqlite_parser.py)';
@@ -0,0 +1,17 @@
+-- KML Network Summary Columns
+-- Per-BSSID roll-up written by pipelines/kml/kml_parser.py: the strongest
+-- signal seen with its position, and the number of observations summarized
+-- (first_seen/last_seen are the earliest/latest observation times, epoch ms)
+-- Apply before running the loader; it does not alter the table itself.
+-- observation_count grows by the locations each import actually inserts into
+-- app.kml_locations_staging (duplicates are skipped by idx_kml_locations_dedupe),
+-- so re-importing a file changes neither.
+
+ALTER TABLE app.kml_networks_staging
+    ADD COLUMN IF NOT EXISTS best_level INTEGER,
+    ADD COLUMN IF NOT EXISTS best_lat DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS best_lon DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS observation_count INTEGER;
+
+COMMENT ON COLUMN app.kml_networks_staging.best_level IS 'Strongest signal (dBm) across the KML observations';
+COMMENT ON COLUMN app.kml_networks_staging.observation_count IS 'Number of KML observations summarized into this row';
@@ -0,0 +1,20 @@
+-- WiGLE Route Polylines
+-- One encoded polyline (Encoded Polyline Algorithm Format, 1e-5 degree
+-- precision) per WiGLE route run, written by pipelines/wigle/wigle_sqlite_parser.py
+-- next to the raw points in app.routes_legacy, so maps can draw drive tracks
+-- without fetching every point
+
+CREATE TABLE IF NOT EXISTS app.wigle_route_polylines (
+    source_key TEXT NOT NULL,         -- device key (or file name) of the backup
+    run_id INTEGER NOT NULL,          -- WiGLE route.run_id
+    point_count INTEGER NOT NULL,     -- points kept after dropping repeats
+    start_time BIGINT,                -- epoch milliseconds
+    end_time BIGINT,
+    polyline TEXT NOT NULL,
+    filename TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (source_key, run_id)
+);
+
+COMMENT ON TABLE app.wigle_route_polylines IS
+'Encoded polyline per WiGLE route run for lightweight track rendering';
@@ -9,6 +9,10 @@ const execAsync = promisify(exec);
 const router = Router();
 const pool = new pg.Pool({ connectionString: process.env.DATABASE_URL });
 
+// Plain KML plus the KMZ and compressed variants kml_parser.py reads directly
+const KML_EXTENSIONS = ['.kml', '.kmz', '.kml.gz', '.kml.xz', '.kml.zst', '.kml.zstd'];
+const isKmlFile = (f: string) => KML_EXTENSIONS.some(ext => f.toLowerCase().endsWith(ext));
+
 /**
  * GET /api/v1/pipelines/kml/files
  * List all KML files available for import
@@ -18,7 +22,7 @@ router.get('/kml/files', async (_req, res) => {
     const kmlDir = path.join(process.cwd(), 'pipelines', 'kml');
     const files = await fs.readdir(kmlDir);
     const kmlFiles = files
-      .filter(f => f.endsWith('.kml'))
+      .filter(isKmlFile)
       .map(f => ({
         filename: f,
         path: path.join(kmlDir, f)
@@ -135,7 +139,7 @@ router.post('/kml/import-all', async (_req, res) => {
   try {
     const kmlDir = path.join(process.cwd(), 'pipelines', 'kml');
     const files = await fs.readdir(kmlDir);
-    const kmlFiles = files.filter(f => f.endsWith('.kml'));
+    const kmlFiles = files.filter(isKmlFile);
 
     const results = [];
     let totalNetworks = 0;